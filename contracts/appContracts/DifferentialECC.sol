@@ -0,0 +1,34 @@
+// SPDX-License-Identifier: Apache 2.0
+pragma solidity >=0.8.19 <0.9.0;
+/**
+ * @title Differential testing of the elliptic curve operations
+ * @dev DifferentialECC exposes the internal functions of EllipticCurveMaths so that
+ * the off-chain code (differential_testing.py) can compare their results with the
+ * Python implementation through eth_call.
+ *
+ * The curve is the one imported by EllipticCurveMaths.sol: to test another curve,
+ * change the import in EllipticCurveMaths.sol and compile again.
+ *
+ * @author Alessandro Bigiotti
+ */
+
+import {EllipticCurveMaths} from "./EllipticCurveMaths.sol";
+
+contract DifferentialECC {
+
+    function checkAddPoint(uint256 x1, uint256 y1, uint256 x2, uint256 y2) public view returns(uint, uint) {
+        return EllipticCurveMaths.addPoint(x1, y1, x2, y2);
+    }
+
+    function checkDoublePoint(uint256 x, uint256 y) public view returns(uint, uint) {
+        return EllipticCurveMaths.doublePoint(x, y);
+    }
+
+    function checkScalarMultiplication(uint256 k, uint256 x, uint256 y) public view returns(uint, uint) {
+        return EllipticCurveMaths.scalarMultiplication(k, x, y);
+    }
+
+    function checkInterleavedScalarMultiplication(uint256 k1, uint256 k2, uint256 pkx, uint256 pky) public view returns(uint) {
+        return EllipticCurveMaths.interleavedScalarMultiplicationJacobian(k1, k2, pkx, pky);
+    }
+}
@@ -514,12 +514,6 @@ library EllipticCurveMaths {
     */
     function interleavedScalarMultiplicationJacobian(uint256 k1, uint256 k2, uint256 pkx, uint256 pky
     ) internal view returns (uint256 rx) {
-        // k1 and k2 cannot be = 0 since are the parameters u1 and u2 for the sign verification
-        // We can avoid this check
-
-        uint256 ry;
-        uint256 rz;
-
         // Precompute the values Pk + G in precX and precY
         // it will be used during the Strauss Shamir's trick algorithm
         uint256 precX;
@@ -528,6 +522,31 @@ library EllipticCurveMaths {
         (precX, precY, precZ) = jacobianAddition(pkx, pky, 1, Gx, Gy, 1);
         (precX, precY) = toAffine(precX, precY, precZ);
 
+        return interleavedScalarMultiplicationJacobianPrecomputed(k1, k2, pkx, pky, precX, precY);
+    }
+
+    /**
+    * @dev Function to perform Straus's Shamir's Trick (k1 * G + k2 * Pk) given the point Pk + G.
+    * The point Pk + G depends only on the public key: it can be computed once, when the key
+    * is updated, and passed to every verification
+    *
+    * @param k1 The scalar to multiply per the generator point G
+    * @param k2 The scalar to multiply per the public key Pk
+    * @param pkx The x-coordinate of the public key
+    * @param pky The y-coordinate of the public key
+    * @param precX The x-coordinate of Pk + G (affine)
+    * @param precY The y-coordinate of Pk + G (affine)
+    * @return rx The x-coordinate of the result mod p
+    */
+    function interleavedScalarMultiplicationJacobianPrecomputed(uint256 k1, uint256 k2, uint256 pkx, uint256 pky,
+        uint256 precX, uint256 precY
+    ) internal view returns (uint256 rx) {
+        // k1 and k2 cannot be = 0 since are the parameters u1 and u2 for the sign verification
+        // We can avoid this check
+
+        uint256 ry;
+        uint256 rz;
+
         // Start the Strauss-Shamir's Trick
         assembly ("memory-safe") {
 
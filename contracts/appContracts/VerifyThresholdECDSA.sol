@@ -42,6 +42,20 @@ interface ITargetSmartContract{
 
 contract VerifyThresholdECDSA {
 
+    // A signature of an inter-chain transaction submitted in a batch.
+    // v is the recovery id (27 or 28) for the ecrecover verification on secp256k1, 0 otherwise
+    struct InterChainSignature {
+        uint256 nonce;
+        address sender;
+        uint256 val;
+        uint256 r;
+        uint256 s;
+        uint8 v;
+    }
+
+    // Result of each signature of a batch, read by the off-chain batcher
+    event eventBatchSignatureVerified(address indexed from, uint indexed nonce, uint index, bool valid);
+
     // The address of the person who deployed the smart contract
     address owner;
 
@@ -55,6 +69,11 @@ contract VerifyThresholdECDSA {
     // Store the public key of the off-cahin component
     uint256 public Px = 108169464601335927917081726752577969247086109515075234060395755233675910322491;
     uint256 public Py = 22464450346750730310129665165845391043579291937531806120449729571760363935549;
+    // Store the address derived from the public key (used by the ecrecover verification on secp256k1)
+    address public publicKeyAddress;
+    // Address of the code that stores (Px, Py, Pk+G). The values are written once, when the public key is updated,
+    // and read with a single EXTCODECOPY: it is cheaper than two more SLOADs or computing Pk + G at every verification
+    address public publicKeyData;
 
     // At the time of deployment, the addresses of the source and
     // destination smart contracts must be specified
@@ -62,6 +81,8 @@ contract VerifyThresholdECDSA {
         owner = msg.sender;
         sourceSmartContract = _sourceSmartContract;
         targetSmartContract = _targetSmartContract;
+        publicKeyAddress = computeAddress(Px, Py);
+        storePublicKeyData(Px, Py);
     }
 
     /**
@@ -82,19 +103,57 @@ contract VerifyThresholdECDSA {
      * @return Returns true if the signature is valid, false otherwise.
      */
     function verifySignature(uint256 hashInt, uint256 r, uint256 s) public view returns(bool) {
-        require(r > 0 && r < p);
-        require(s > 0 && s < p);
+        require(r > 0 && r < p, "The r value must be greater than 0 and less than p");
+        require(s > 0 && s < p, "The s value must be greater than 0 and less than p");
         // Compute s^-1 mod p
         uint sinv = EllipticCurveMaths.invMod(s);
         // Compute the value u1 = H(m) * s^-1
         uint u1 = mulmod(sinv, hashInt, p);
         // Compute the value u2 = r * s^-1
         uint u2 = mulmod(r, sinv, p);
-        uint fx = EllipticCurveMaths.interleavedScalarMultiplicationJacobian(u1, u2, Px, Py);
-        require(fx == r);
+        // Load the public key and the precomputed point Pk + G
+        (uint256 pkx, uint256 pky, uint256 precX, uint256 precY) = loadPublicKeyData();
+        uint fx = EllipticCurveMaths.interleavedScalarMultiplicationJacobianPrecomputed(u1, u2, pkx, pky, precX, precY);
+        require(fx == r, "Invalid signature");
         return (fx == r);
     }
 
+    /**
+     * @dev This function verifies an ECDSA digital signature through the ecrecover precompile.
+     *
+     * It is available only on secp256k1. Given the recovery id v (27 or 28, the parity of the y-coordinate
+     * of the point R = k * G), ecrecover computes Q = r^-1 * (s * R - H(m) * G), which is equal to the
+     * public key if and only if the signature is valid. The address of Q is compared with the address
+     * derived from the stored public key. The cost is about 3000 gas instead of the interleaved multiplication.
+     *
+     * @param hashInt Hash of the message to be signed.
+     * @param r First coordinate of the public key used for signing.
+     * @param s Second coordinate of the public key used for signing.
+     * @param v Recovery id of the signature (27 or 28).
+     *
+     * @return Returns true if the signature is valid, false otherwise.
+     */
+    function verifySignatureRecover(uint256 hashInt, uint256 r, uint256 s, uint8 v) public view returns(bool) {
+        require(isSecp256k1, "ecrecover is available only on secp256k1");
+        require(r > 0 && r < p, "The r value must be greater than 0 and less than p");
+        require(s > 0 && s < p, "The s value must be greater than 0 and less than p");
+        require(v == 27 || v == 28, "The v value must be 27 or 28");
+        address signer = ecrecover(bytes32(hashInt), v, bytes32(r), bytes32(s));
+        require(signer != address(0) && signer == publicKeyAddress, "Invalid signature");
+        return true;
+    }
+
+    /**
+     * @dev This function selects the verification procedure: the ecrecover precompile is used on
+     * secp256k1 when the recovery id is provided (v != 0), the interleaved multiplication otherwise.
+     */
+    function checkSignature(uint256 hashInt, uint256 r, uint256 s, uint8 v) internal view returns(bool) {
+        if (isSecp256k1 && v != 0) {
+            return verifySignatureRecover(hashInt, r, s, v);
+        }
+        return verifySignature(hashInt, r, s);
+    }
+
     /**
      * @dev This function verifies an ECDSA digital signature.
      *
@@ -115,12 +174,37 @@ contract VerifyThresholdECDSA {
      * @return Returns true if the signature is valid, false otherwise.
      */
     function verifyECDSA(uint256 _nonce, uint256 val1, uint256 val2, string calldata val3, uint256 r, uint256 s) public returns(bool) {
+       return verifyECDSAInternal(keccak256(abi.encodePacked(val1, val2, val3, msg.sender, _nonce)), r, s, 0);
+    }
+
+    /**
+     * @dev Same as verifyECDSA, the signature is verified through ecrecover on secp256k1.
+     * @param v Recovery id of the signature (27 or 28).
+     */
+    function verifyECDSARecover(uint256 _nonce, uint256 val1, uint256 val2, string calldata val3, uint256 r, uint256 s, uint8 v) public returns(bool) {
+       return verifyECDSAInternal(keccak256(abi.encodePacked(val1, val2, val3, msg.sender, _nonce)), r, s, v);
+    }
+
+    /**
+     * @dev Same as verifyECDSARecover, the arguments are packed in a single bytes value:
+     *      val1 (32 bytes) | val2 (32 bytes) | val3 | sender (20 bytes) | _nonce (32 bytes) | r (32 bytes) | s (32 bytes) | v (1 byte)
+     * The first part is the preimage of the message hash, it is hashed as it is read from the calldata.
+     * The sender must be the caller. Without ABI padding and string offset the calldata is smaller.
+     * @param data The packed arguments.
+     */
+    function verifyECDSAPacked(bytes calldata data) public returns(bool) {
+       require(data.length >= 181, "Invalid packed data");
+       uint256 preimageLength = data.length - 65;
+       require(address(bytes20(data[preimageLength-52:preimageLength-32])) == msg.sender, "The sender must be the caller");
+       (uint256 r, uint256 s, uint8 v) = unpackSignature(data[preimageLength:]);
+       return verifyECDSAInternal(keccak256(data[:preimageLength]), r, s, v);
+    }
+
+    function verifyECDSAInternal(bytes32 messageHash, uint256 r, uint256 s, uint8 v) internal returns(bool) {
        require(r > 0 && r < p, "The r value must be greater than 0 and less than p");
        require(s > 0 && s < p, "The s value must be greater than 0 and less than p");
-       // Hash the message
-       bytes32 messageHash = keccak256(abi.encodePacked(val1, val2, val3, msg.sender, _nonce));
 
-       if (verifySignature(uint(messageHash), r, s)) {
+       if (checkSignature(uint(messageHash), r, s, v)) {
            // Start an inter-chain transaction...
            checkECDSA = true;
            return true;
@@ -152,13 +236,42 @@ contract VerifyThresholdECDSA {
     function verifyECDSAForInterChainSyncDataEnd(
       uint256 _nonce, address _sender, uint256 val, uint256 r, uint256 s
     ) public returns(bool) {
+        return verifyECDSAForInterChainSyncDataEndInternal(keccak256(abi.encodePacked(_nonce, _sender, val)), _nonce, _sender, val, r, s, 0);
+    }
+
+    /**
+     * @dev Same as verifyECDSAForInterChainSyncDataEnd, the signature is verified through ecrecover on secp256k1.
+     * @param v Recovery id of the signature (27 or 28).
+     */
+    function verifyECDSAForInterChainSyncDataEndRecover(
+      uint256 _nonce, address _sender, uint256 val, uint256 r, uint256 s, uint8 v
+    ) public returns(bool) {
+        return verifyECDSAForInterChainSyncDataEndInternal(keccak256(abi.encodePacked(_nonce, _sender, val)), _nonce, _sender, val, r, s, v);
+    }
+
+    /**
+     * @dev Same as verifyECDSAForInterChainSyncDataEndRecover, the arguments are packed in a single bytes value:
+     *      _nonce (32 bytes) | _sender (20 bytes) | val (32 bytes) | r (32 bytes) | s (32 bytes) | v (1 byte)
+     * The first 84 bytes are the preimage of the message hash.
+     * @param data The packed arguments.
+     */
+    function verifyECDSAForInterChainSyncDataEndPacked(bytes calldata data) public returns(bool) {
+        require(data.length == 149, "Invalid packed data");
+        (uint256 r, uint256 s, uint8 v) = unpackSignature(data[84:]);
+        return verifyECDSAForInterChainSyncDataEndInternal(
+            keccak256(data[:84]), uint256(bytes32(data[:32])), address(bytes20(data[32:52])), uint256(bytes32(data[52:84])), r, s, v
+        );
+    }
+
+    function verifyECDSAForInterChainSyncDataEndInternal(
+      bytes32 messageHash, uint256 _nonce, address _sender, uint256 val, uint256 r, uint256 s, uint8 v
+    ) internal returns(bool) {
         if (r == 0 && s == 0) {
             this.notifyBadSignatureEnd(_nonce, _sender);
             return false;
         }
 
-        bytes32 messageHash = keccak256(abi.encodePacked(_nonce, _sender, val));
-        if (verifySignature(uint(messageHash), r, s)) {
+        if (checkSignature(uint(messageHash), r, s, v)) {
             this.interChainTransactionSyncDataEnd(_nonce, _sender, val);
             return true;
         }
@@ -186,14 +299,42 @@ contract VerifyThresholdECDSA {
     function verifyECDSAForInterChainSyncDataExecution(
         uint256 _nonce, address _sender, uint256 val, uint256 r, uint256 s
     ) public returns(bool) {
+        return verifyECDSAForInterChainSyncDataExecutionInternal(keccak256(abi.encodePacked(_nonce, _sender, val)), _nonce, _sender, val, r, s, 0);
+    }
+
+    /**
+     * @dev Same as verifyECDSAForInterChainSyncDataExecution, the signature is verified through ecrecover on secp256k1.
+     * @param v Recovery id of the signature (27 or 28).
+     */
+    function verifyECDSAForInterChainSyncDataExecutionRecover(
+        uint256 _nonce, address _sender, uint256 val, uint256 r, uint256 s, uint8 v
+    ) public returns(bool) {
+        return verifyECDSAForInterChainSyncDataExecutionInternal(keccak256(abi.encodePacked(_nonce, _sender, val)), _nonce, _sender, val, r, s, v);
+    }
+
+    /**
+     * @dev Same as verifyECDSAForInterChainSyncDataExecutionRecover, the arguments are packed in a single bytes value:
+     *      _nonce (32 bytes) | _sender (20 bytes) | val (32 bytes) | r (32 bytes) | s (32 bytes) | v (1 byte)
+     * The first 84 bytes are the preimage of the message hash.
+     * @param data The packed arguments.
+     */
+    function verifyECDSAForInterChainSyncDataExecutionPacked(bytes calldata data) public returns(bool) {
+        require(data.length == 149, "Invalid packed data");
+        (uint256 r, uint256 s, uint8 v) = unpackSignature(data[84:]);
+        return verifyECDSAForInterChainSyncDataExecutionInternal(
+            keccak256(data[:84]), uint256(bytes32(data[:32])), address(bytes20(data[32:52])), uint256(bytes32(data[52:84])), r, s, v
+        );
+    }
+
+    function verifyECDSAForInterChainSyncDataExecutionInternal(
+        bytes32 messageHash, uint256 _nonce, address _sender, uint256 val, uint256 r, uint256 s, uint8 v
+    ) internal returns(bool) {
         if (r == 0 && s == 0) {
             this.notifyBadSignatureExecute(_nonce, _sender);
             return false;
         }
 
-        bytes32 messageHash = keccak256(abi.encodePacked(_nonce, _sender, val));
-
-        if (verifySignature(uint(messageHash), r, s)) {
+        if (checkSignature(uint(messageHash), r, s, v)) {
             this.interChainTransactionSyncDataExecute(_nonce, _sender, "SYNC_DATA", val);
             return true;
         }
@@ -202,6 +343,74 @@ contract VerifyThresholdECDSA {
 
     }
 
+    /**
+     * Brief: Verifies a batch of ECDSA digital signatures for inter-chain execution.
+     *
+     * Each signature is verified and dispatched independently, exactly as a call to
+     * verifyECDSAForInterChainSyncDataExecutionRecover (v = 0 selects the verification through the
+     * curve operations): a bad signature does not revert the others, its result is false.
+     * An entry that runs out of gas reverts the whole batch, so an under-gassed transaction fails
+     * instead of marking valid signatures as false. It is detected with the 63/64 rule: a call that
+     * uses all the gas it was given leaves the batch with at most 1/64 of the gas it had before the
+     * call, while a reverted entry returns its unused gas.
+     * The result of each entry is emitted with eventBatchSignatureVerified.
+     * Many inter-chain steps share the 21000 base cost and one block slot.
+     *
+     * @param signatures The signatures of the inter-chain transactions.
+     *
+     * @return results Returns, for each signature, true if it is valid, false otherwise.
+     */
+    function verifyECDSAForInterChainSyncDataExecutionBatch(
+        InterChainSignature[] calldata signatures
+    ) public returns(bool[] memory results) {
+        results = new bool[](signatures.length);
+        for (uint i = 0; i < signatures.length; i++) {
+            InterChainSignature calldata sig = signatures[i];
+            uint256 gasBefore = gasleft();
+            try this.verifyECDSAForInterChainSyncDataExecutionRecover(sig.nonce, sig.sender, sig.val, sig.r, sig.s, sig.v) returns (bool valid) {
+                results[i] = valid;
+            } catch {
+                // The entry used all the gas it was given: revert instead of reporting a valid signature as false
+                require(gasleft() > gasBefore / 63, "Batch entry ran out of gas");
+                results[i] = false;
+            }
+            emit eventBatchSignatureVerified(sig.sender, sig.nonce, i, results[i]);
+        }
+        return results;
+    }
+
+    /**
+     * Brief: Verifies a batch of ECDSA digital signatures for inter-chain synchronisation data end.
+     *
+     * Each signature is verified and dispatched independently, exactly as a call to
+     * verifyECDSAForInterChainSyncDataEndRecover (v = 0 selects the verification through the
+     * curve operations): a bad signature does not revert the others, its result is false.
+     * As in verifyECDSAForInterChainSyncDataExecutionBatch, an entry running out of gas reverts
+     * the whole batch and each result is emitted with eventBatchSignatureVerified.
+     *
+     * @param signatures The signatures of the inter-chain transactions.
+     *
+     * @return results Returns, for each signature, true if it is valid, false otherwise.
+     */
+    function verifyECDSAForInterChainSyncDataEndBatch(
+        InterChainSignature[] calldata signatures
+    ) public returns(bool[] memory results) {
+        results = new bool[](signatures.length);
+        for (uint i = 0; i < signatures.length; i++) {
+            InterChainSignature calldata sig = signatures[i];
+            uint256 gasBefore = gasleft();
+            try this.verifyECDSAForInterChainSyncDataEndRecover(sig.nonce, sig.sender, sig.val, sig.r, sig.s, sig.v) returns (bool valid) {
+                results[i] = valid;
+            } catch {
+                // The entry used all the gas it was given: revert instead of reporting a valid signature as false
+                require(gasleft() > gasBefore / 63, "Batch entry ran out of gas");
+                results[i] = false;
+            }
+            emit eventBatchSignatureVerified(sig.sender, sig.nonce, i, results[i]);
+        }
+        return results;
+    }
+
     /**
      * @dev This function is used to end an inter-chain transaction aimed at synchronising smart contracts data.
      * The function first verifies if the caller is the contract itself, then it calls the corresponding
@@ -266,8 +475,61 @@ contract VerifyThresholdECDSA {
 
         Px = _Px;
         Py = _Py;
+        publicKeyAddress = computeAddress(_Px, _Py);
+        storePublicKeyData(_Px, _Py);
 
         return(true);
     }
 
+    /**
+     * @dev This function computes the point Pk + G and stores (Px, Py, Pk + G) as the code of a new contract.
+     * The code starts with a STOP opcode so that it cannot be executed.
+     *
+     * @param _Px The x-coordinate of the public key.
+     * @param _Py The y-coordinate of the public key.
+     */
+    function storePublicKeyData(uint256 _Px, uint256 _Py) internal {
+        (uint256 x, uint256 y, uint256 z) = EllipticCurveMaths.jacobianAddition(_Px, _Py, 1, Gx, Gy, 1);
+        (uint256 precX, uint256 precY) = EllipticCurveMaths.toAffine(x, y, z);
+
+        bytes memory code = abi.encodePacked(hex"00", _Px, _Py, precX, precY);
+        // Creation code: PUSH4 len, DUP1, PUSH1 14, PUSH1 0, CODECOPY, PUSH1 0, RETURN
+        bytes memory creationCode = abi.encodePacked(hex"63", uint32(code.length), hex"80600e6000396000f3", code);
+        address pointer;
+        assembly ("memory-safe") {
+            pointer := create(0, add(creationCode, 32), mload(creationCode))
+        }
+        require(pointer != address(0), "Unable to store the public key data.");
+        publicKeyData = pointer;
+    }
+
+    /**
+     * @dev This function reads (Px, Py, Pk + G) stored by storePublicKeyData.
+     */
+    function loadPublicKeyData() internal view returns(uint256 pkx, uint256 pky, uint256 precX, uint256 precY) {
+        address pointer = publicKeyData;
+        assembly ("memory-safe") {
+            let ptr := mload(0x40)
+            // Skip the STOP opcode
+            extcodecopy(pointer, ptr, 1, 128)
+            pkx := mload(ptr)
+            pky := mload(add(ptr, 32))
+            precX := mload(add(ptr, 64))
+            precY := mload(add(ptr, 96))
+        }
+    }
+
+    // Read the signature packed as r (32 bytes) | s (32 bytes) | v (1 byte)
+    function unpackSignature(bytes calldata data) internal pure returns(uint256 r, uint256 s, uint8 v) {
+        require(data.length == 65, "Invalid packed signature");
+        r = uint256(bytes32(data[:32]));
+        s = uint256(bytes32(data[32:64]));
+        v = uint8(data[64]);
+    }
+
+    // Compute the Ethereum address of a public key: the last 20 bytes of keccak256(Px || Py)
+    function computeAddress(uint256 _Px, uint256 _Py) internal pure returns(address) {
+        return address(uint160(uint256(keccak256(abi.encodePacked(_Px, _Py)))));
+    }
+
 }
@@ -5,6 +5,8 @@ pragma solidity >=0.8.0 <0.9.0;
 bool constant isZeroA = false;
 bool constant isNegativeA = false;
 bool constant isPositiveA = true;
+// Auxiliary boolean to enable the ecrecover precompile (available only on secp256k1)
+bool constant isSecp256k1 = false;
 
 // BRAINPOOLP256R1 domain parameters
 // q is the order of the finite field Fq
@@ -5,6 +5,8 @@ pragma solidity >=0.8.0 <0.9.0;
 bool constant isZeroA = true;
 bool constant isNegativeA = false;
 bool constant isPositiveA = false;
+// Auxiliary boolean to enable the ecrecover precompile (available only on secp256k1)
+bool constant isSecp256k1 = true;
 
 // SECP256K1 Domain Parameters
 // q is the order of the finite field Fq
@@ -5,6 +5,8 @@ pragma solidity >=0.8.0 <0.9.0;
 bool constant isZeroA = false;
 bool constant isNegativeA = true;
 bool constant isPositiveA = false;
+// Auxiliary boolean to enable the ecrecover precompile (available only on secp256k1)
+bool constant isSecp256k1 = false;
 
 // SECP256R1 Domain Parameters
 // q is the order of the finite field Fq
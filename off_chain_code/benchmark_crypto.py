@@ -0,0 +1,183 @@
+import sys
+sys.path.insert(1, '../threshold-ecdsa-in-off-chain-components/off_chain_code')
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import time
+import timeit
+from curves import CURVES
+from threshold_core.curve import ecdsa_sign, ecdsa_verify
+from threshold_core.sharing import share_secret, lagrange_coefficient
+from threshold_core.threshold import key_gen, partial_ecdsa_sign, combine_partial_signatures
+
+################################################################################
+# FILE DESCRIPTION:
+# This file contains an offline micro-benchmark suite for the off-chain
+# cryptography. No blockchain connection is needed: every operation is timed
+# on the three supported curves and, for the threshold operations, on a grid
+# of (n, t) sizes. Results (median milliseconds per call) are written to a
+# JSON baseline; the compare mode runs the suite again and reports the
+# operations slower than the baseline beyond a given threshold.
+# The import time of threshold_core is measured in a fresh interpreter and
+# checked against a budget: the import must not load any blockchain module.
+#
+# Usage:
+#   python benchmark_crypto.py --output baseline.json
+#   python benchmark_crypto.py --compare baseline.json --threshold 0.2
+################################################################################
+
+DEFAULT_SIZES = [(3, 2), (5, 3), (10, 7)]
+# Maximum milliseconds to import the core package
+DEFAULT_IMPORT_BUDGET = 50
+# Modules that the core package must not load
+BLOCKCHAIN_MODULES = ['web3', 'eth_utils', 'eth_account', 'eth_abi']
+
+IMPORT_CODE = '''
+import sys, time
+start = time.perf_counter()
+import threshold_core.curve, threshold_core.sharing, threshold_core.threshold
+print((time.perf_counter() - start) * 1000)
+print(','.join(module for module in {} if module in sys.modules))
+'''.format(BLOCKCHAIN_MODULES)
+
+
+# Function to time a callable, it returns the median milliseconds per call
+def measure(func, number, repeat):
+    timings = timeit.repeat(func, number=number, repeat=repeat)
+    return statistics.median(timings) / number * 1000
+
+
+# Function to measure the import time of threshold_core in a fresh interpreter,
+# it returns the median milliseconds and the blockchain modules loaded by the import
+def measure_import(repeat):
+    timings = []
+    loaded = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_CODE], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.split('\n')
+        timings.append(float(output[0]))
+        loaded = [module for module in output[1].split(',') if module]
+    return statistics.median(timings), loaded
+
+
+# Function to run the benchmarks of the single-key operations on a curve
+def benchmark_curve(curve, rng, number, repeat):
+    results = dict()
+    sk = rng.randrange(1, curve.n)
+    pk = curve.multiply_point(sk, curve.G)
+    k = rng.randrange(1, curve.n)
+    point = curve.multiply_point(rng.randrange(1, curve.n), curve.G)
+    hash = hashlib.sha256(rng.randbytes(32)).digest()
+    sign = ecdsa_sign(sk, hash, curve)
+
+    results['multiply_point'] = measure(lambda: curve.multiply_point(k, curve.G), number, repeat)
+    # Multiplication without the cached window table
+    results['double_and_add'] = measure(lambda: curve.double_and_add(k, point), number, repeat)
+    results['add_points'] = measure(lambda: curve.add_points(point, pk), number * 100, repeat)
+    results['ecdsa_sign'] = measure(lambda: ecdsa_sign(sk, hash, curve), number, repeat)
+    results['ecdsa_verify'] = measure(lambda: ecdsa_verify(pk, hash, sign, curve), number, repeat)
+    return results
+
+
+# Function to run the benchmarks of the threshold operations on a curve for a given (n, t)
+def benchmark_threshold(curve, n, t, rng, number, repeat):
+    results = dict()
+    secret = rng.randrange(1, curve.n)
+    hash = hashlib.sha256(rng.randbytes(32)).digest()
+    shares, public_keys = key_gen(secret, n, t, curve)
+    ids_signers = sorted(rng.sample(range(1, n + 1), t))
+    k = rng.randrange(1, curve.n)
+    partial_signatures = [(index, partial_ecdsa_sign(shares[index-1][1], hash, k, curve)) for index in ids_signers]
+
+    results['share_secret'] = measure(lambda: share_secret(secret, n, t, curve), number * 10, repeat)
+    results['lagrange_coefficient'] = measure(lambda: lagrange_coefficient(ids_signers[0], ids_signers, curve), number * 100, repeat)
+    results['key_gen'] = measure(lambda: key_gen(secret, n, t, curve), 1, repeat)
+    results['partial_ecdsa_sign'] = measure(lambda: partial_ecdsa_sign(shares[0][1], hash, k, curve), number, repeat)
+    results['combine_partial_signatures'] = measure(lambda: combine_partial_signatures(partial_signatures, ids_signers, curve), number * 10, repeat)
+    return results
+
+
+# Function to run the whole suite, it returns a dictionary: benchmark name -> milliseconds
+def run_suite(curve_names, sizes, number, repeat, seed):
+    rng = random.Random(seed)
+    results = dict()
+    results['import/threshold_core'], _ = measure_import(repeat)
+    for name in curve_names:
+        curve = CURVES[name]
+        for operation, value in benchmark_curve(curve, rng, number, repeat).items():
+            results['{}/{}'.format(name, operation)] = value
+        for n, t in sizes:
+            for operation, value in benchmark_threshold(curve, n, t, rng, number, repeat).items():
+                results['{}/{}/n={},t={}'.format(name, operation, n, t)] = value
+    return results
+
+
+# Function to compare the results against a baseline, it returns the list of the regressions
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, value in sorted(results.items()):
+        if name not in baseline:
+            continue
+        ratio = value / baseline[name]
+        if ratio > 1 + threshold:
+            regressions.append((name, baseline[name], value, ratio))
+    return regressions
+
+
+def parse_sizes(value):
+    sizes = []
+    for size in value.split(','):
+        n, t = size.split(':')
+        sizes.append((int(n), int(t)))
+    return sizes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Offline micro-benchmarks of the off-chain cryptography")
+    parser.add_argument('--curves', default=','.join(CURVES.keys()), help="comma separated list of curves")
+    parser.add_argument('--sizes', default=','.join('{}:{}'.format(n, t) for n, t in DEFAULT_SIZES), help="comma separated list of n:t")
+    parser.add_argument('--number', type=int, default=3, help="calls per timing of the slowest operations")
+    parser.add_argument('--repeat', type=int, default=5, help="timings per operation (the median is kept)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the generated inputs")
+    parser.add_argument('--output', help="path of the JSON baseline to write")
+    parser.add_argument('--compare', help="path of the JSON baseline to compare with")
+    parser.add_argument('--threshold', type=float, default=0.2, help="relative slowdown reported as regression")
+    parser.add_argument('--import-budget', type=float, default=DEFAULT_IMPORT_BUDGET, help="maximum milliseconds to import threshold_core")
+    args = parser.parse_args()
+
+    import_time, loaded = measure_import(args.repeat)
+    print("Import of threshold_core: {:.1f} ms (budget {:.1f} ms)".format(import_time, args.import_budget))
+    if loaded:
+        print("The import of threshold_core loads blockchain modules: {}".format(', '.join(loaded)))
+    if import_time > args.import_budget or loaded:
+        sys.exit(1)
+
+    results = run_suite(args.curves.split(','), parse_sizes(args.sizes), args.number, args.repeat, args.seed)
+    for name, value in results.items():
+        print("{:<60} {:>10.3f} ms".format(name, value))
+
+    if args.output:
+        with open(args.output, 'w') as json_file:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'timestamp': int(time.time()),
+                'results': results
+            }, json_file, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as json_file:
+            baseline = json.load(json_file)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, after, ratio in regressions:
+            print("REGRESSION {:<60} {:.3f} ms -> {:.3f} ms (x{:.2f})".format(name, before, after, ratio))
+        if regressions:
+            sys.exit(1)
+        print("No regressions beyond {:.0%}".format(args.threshold))
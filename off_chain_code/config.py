@@ -6,7 +6,19 @@ sepolia_testnetwork = ['wss://eth-sepolia.g.alchemy.com/v2/<YOUR_API_KEY>']
 optimism_testnetwork = ['wss://opt-sepolia.g.alchemy.com/v2/<YOUR_API_KEY>']
 shimmer_testnet = ['wss://ws.json-rpc.evm.testnet.shimmer.network/']
 
+# Folder of the compiled contracts (truffle compile), shared by the Besu and the local EVM scripts
+build_path = '../threshold-ecdsa-in-off-chain-components/build/contracts'
+
+# Networks opened by the provider pool (provider_pool.py): name -> list of endpoints
+networks = {
+    'besu1': ws_besu_1,
+    'besu2': ws_besu_2
+}
+
 besu_1_sk = 'YOUR PV KEY'
 besu_2_sk = 'YOUR PV KEY'
 
 testnet_sk = 'YOUR PV KEY'
+
+# Password of the keystore of the threshold key (keystore.py)
+keystore_password = 'YOUR KEYSTORE PASSWORD'
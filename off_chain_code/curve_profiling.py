@@ -0,0 +1,177 @@
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+import threshold_core.curve
+from threshold_core.curve import EllipticCurveOperations
+
+#############################################################
+# This file contains the optional instrumentation of the elliptic curve
+# operations and of the secret sharing functions. When the profiling is
+# enabled (profile_operations context manager) the methods of the class
+# EllipticCurveOperations and the functions of the modules listed below
+# are replaced by wrappers counting and timing each call per call site.
+# The original functions are restored when the context exits, so the
+# instrumentation costs nothing when it is disabled.
+#
+# Counted operations: point additions, point doublings, modular inversions,
+# on-curve checks, scalar multiplications, multi-scalar multiplications,
+# Lagrange coefficients, polynomial evaluations, secret sharings and
+# (partial) signatures.
+# Times are inclusive: the time of a scalar multiplication includes the
+# time of its additions and doublings. The operations of the cached window
+# tables (Jacobian coordinates) are counted through the count_operation hook
+# of threshold_core.curve, without a time of their own.
+#############################################################
+
+# Module functions to instrument: (module, function) -> operation name, inversions per call
+MODULE_FUNCTIONS = {
+    ('threshold_core.curve', 'ecdsa_sign'): ('ecdsa_sign', 1),
+    ('threshold_core.curve', 'ecdsa_verify'): ('ecdsa_verify', 1),
+    ('threshold_core.sharing', 'lagrange_coefficient'): ('lagrange_coefficient', 1),
+    ('threshold_core.sharing', 'evaluate_polynomial'): ('polynomial_evaluation', 0),
+    ('threshold_core.sharing', 'share_secret'): ('share_secret', 0),
+    ('threshold_core.threshold', 'partial_ecdsa_sign'): ('partial_ecdsa_sign', 1),
+    ('threshold_core.threshold', 'combine_partial_signatures'): ('combine_partial_signatures', 0),
+    ('threshold_core.threshold', 'key_gen'): ('key_gen', 0),
+}
+
+_active = None # counters of the active profiling context
+_active_lock = threading.Lock()
+
+
+# Function to get the call site of an instrumented function
+def call_site(depth=2):
+    frame = sys._getframe(depth)
+    return '{}:{} ({})'.format(os.path.basename(frame.f_code.co_filename), frame.f_lineno, frame.f_code.co_name)
+
+
+# Class collecting the counters of the operations
+class OperationCounters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = dict() # operation -> number of calls
+        self.times = dict() # operation -> total time in nanoseconds
+        self.sites = dict() # operation -> {call site -> number of calls}
+
+    def add(self, operation, site, elapsed_ns=0, count=1):
+        with self.lock:
+            self.counts[operation] = self.counts.get(operation, 0) + count
+            self.times[operation] = self.times.get(operation, 0) + elapsed_ns
+            sites = self.sites.setdefault(operation, dict())
+            sites[site] = sites.get(site, 0) + count
+
+    # Function to get a copy of the counters, optionally resetting them
+    # (e.g. to attach the operations performed to each signing round)
+    def snapshot(self, reset=False):
+        with self.lock:
+            snapshot = {
+                operation: {
+                    'count': count,
+                    'time_ms': self.times[operation] / 1e6,
+                    'sites': dict(self.sites[operation])
+                }
+                for operation, count in self.counts.items()
+            }
+            if reset:
+                self.counts = dict()
+                self.times = dict()
+                self.sites = dict()
+        return snapshot
+
+    # Function to get only the number of calls of each operation
+    def totals(self):
+        with self.lock:
+            return dict(self.counts)
+
+
+def _wrap_add_points(original, counters):
+    def add_points(self, p1, p2):
+        start = time.perf_counter_ns()
+        result = original(self, p1, p2)
+        elapsed = time.perf_counter_ns() - start
+        if p1.x is None or p1.y is None or p2.x is None or p2.y is None:
+            return result
+        site = call_site()
+        counters.add('point_doubling' if p1 == p2 else 'point_addition', site, elapsed)
+        counters.add('modular_inversion', site)
+        return result
+    return add_points
+
+
+def _wrap_method(original, counters, operation):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter_ns()
+        result = original(*args, **kwargs)
+        counters.add(operation, call_site(), time.perf_counter_ns() - start)
+        return result
+    return wrapper
+
+
+def _wrap_function(original, counters, operation, inversions):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter_ns()
+        result = original(*args, **kwargs)
+        site = call_site()
+        counters.add(operation, site, time.perf_counter_ns() - start)
+        if inversions:
+            counters.add('modular_inversion', site, count=inversions)
+        return result
+    wrapper.__wrapped__ = original
+    return wrapper
+
+
+def _count_operation(counters):
+    def count_operation(operation, count):
+        if count:
+            # Call site of the function performing the window table operations
+            counters.add(operation, call_site(3), count=count)
+    return count_operation
+
+
+# Function to replace the instrumented functions, it returns the list of the patches to restore
+def _install(counters):
+    patches = [(threshold_core.curve, 'count_operation', threshold_core.curve.count_operation)]
+    threshold_core.curve.count_operation = _count_operation(counters)
+    methods = {
+        'add_points': _wrap_add_points(EllipticCurveOperations.add_points, counters),
+        'multiply_point': _wrap_method(EllipticCurveOperations.multiply_point, counters, 'scalar_multiplication'),
+        'multi_scalar_multiply': _wrap_method(EllipticCurveOperations.multi_scalar_multiply, counters, 'multi_scalar_multiplication'),
+        'is_point_on_curve': _wrap_method(EllipticCurveOperations.is_point_on_curve, counters, 'on_curve_check'),
+    }
+    for name, wrapper in methods.items():
+        patches.append((EllipticCurveOperations, name, getattr(EllipticCurveOperations, name)))
+        setattr(EllipticCurveOperations, name, wrapper)
+
+    # The functions are imported by name in other modules,
+    # replace every reference found in the loaded modules
+    for (module_name, name), (operation, inversions) in MODULE_FUNCTIONS.items():
+        module = sys.modules.get(module_name)
+        if module is None or not hasattr(module, name):
+            continue
+        original = getattr(module, name)
+        wrapper = _wrap_function(original, counters, operation, inversions)
+        for loaded in list(sys.modules.values()):
+            if getattr(loaded, name, None) is original:
+                patches.append((loaded, name, original))
+                setattr(loaded, name, wrapper)
+    return patches
+
+
+# Context manager to enable the profiling of the operations
+@contextmanager
+def profile_operations(counters=None):
+    global _active
+    with _active_lock:
+        if _active is not None:
+            raise RuntimeError("The profiling of the operations is already enabled.")
+        _active = counters if counters is not None else OperationCounters()
+        patches = _install(_active)
+    try:
+        yield _active
+    finally:
+        with _active_lock:
+            for target, name, original in reversed(patches):
+                setattr(target, name, original)
+            _active = None
@@ -0,0 +1,52 @@
+from threshold_core.curve import Point, EllipticCurve
+
+#############################################################
+# Domain parameters of the elliptic curves supported by the smart contracts
+# (see secp256k1.sol, secp256r1.sol and brainpoolp256r1.sol)
+#############################################################
+
+# SECP256K1
+secp256k1 = EllipticCurve(
+    p=0xfffffffffffffffffffffffffffffffffffffffffffffffffffffffefffffc2f,
+    a=0,
+    b=7,
+    G=Point(
+        x=55066263022277343669578718895168534326250603453777594175500187360389116729240,
+        y=32670510020758816978083085130507043184471273380659243275938904335757337482424
+    ),
+    n=0xfffffffffffffffffffffffffffffffebaaedce6af48a03bbfd25e8cd0364141,
+    h=1
+)
+
+# SECP256R1
+secp256r1 = EllipticCurve(
+    p=0xffffffff00000001000000000000000000000000ffffffffffffffffffffffff,
+    a=0xffffffff00000001000000000000000000000000fffffffffffffffffffffffc,
+    b=0x5ac635d8aa3a93e7b3ebbd55769886bc651d06b0cc53b0f63bce3c3e27d2604b,
+    G=Point(
+        x=0x6b17d1f2e12c4247f8bce6e563a440f277037d812deb33a0f4a13945d898c296,
+        y=0x4fe342e2fe1a7f9b8ee7eb4a7c0f9e162bce33576b315ececbb6406837bf51f5
+    ),
+    n=0xffffffff00000000ffffffffffffffffbce6faada7179e84f3b9cac2fc632551,
+    h=1
+)
+
+# BRAINPOOLP256r1
+brainpoolp256r1 = EllipticCurve(
+    p=76884956397045344220809746629001649093037950200943055203735601445031516197751,
+    a=56698187605326110043627228396178346077120614539475214109386828188763884139993,
+    b=17577232497321838841075697789794520262950426058923084567046852300633325438902,
+    G=Point(
+        x=63243729749562333355292243550312970334778175571054726587095381623627144114786,
+        y=38218615093753523893122277964030810387585405539772602581557831887485717997975
+    ),
+    n=76884956397045344220809746629001649092737531784414529538755519063063536359079,
+    h=1
+)
+
+# Curves indexed by the name used in the smart contracts
+CURVES = {
+    'secp256k1': secp256k1,
+    'secp256r1': secp256r1,
+    'brainpoolp256r1': brainpoolp256r1,
+}
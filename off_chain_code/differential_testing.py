@@ -0,0 +1,165 @@
+import sys
+sys.path.insert(1, '../threshold-ecdsa-in-off-chain-components/off_chain_code')
+import argparse
+import json
+import random
+import time
+import urllib.request
+from web3 import Web3
+from curves import CURVES
+
+################################################################################
+# FILE DESCRIPTION:
+# This file contains a differential testing harness comparing the results of
+# EllipticCurveMaths.sol (addPoint, doublePoint, scalarMultiplication and the
+# interleaved scalar multiplication, exposed by DifferentialECC.sol) with the
+# Python implementation in threshold_core/curve.py.
+#
+# The input vectors and the expected results are generated with the Python
+# reference, the on-chain evaluations are sent as batched JSON-RPC eth_call
+# requests and compared in bulk. With --rpc (HTTP endpoint of a local EVM,
+# e.g. anvil or a dev Besu node) each batch is a single HTTP request; without
+# it the contract is deployed on the in-process EVM of local_evm.py and each
+# batch is run by the provider in a single session of the EVM.
+#
+# NOTICE: the curve is fixed at compile time by the import in
+# EllipticCurveMaths.sol, --curve must match the compiled artifact.
+#
+# Usage:
+#   python differential_testing.py --curve secp256k1 --count 1000
+#   python differential_testing.py --curve secp256r1 --rpc http://localhost:8545 --address 0x...
+################################################################################
+
+OPERATIONS = ['checkAddPoint', 'checkDoublePoint', 'checkScalarMultiplication', 'checkInterleavedScalarMultiplication']
+
+
+# Function to generate random points: each point is the previous one plus a random step
+def random_points(curve, count, rng):
+    step = curve.multiply_point(rng.randrange(1, curve.n), curve.G)
+    point = curve.multiply_point(rng.randrange(1, curve.n), curve.G)
+    points = []
+    for _ in range(count):
+        point = curve.add_points(point, step)
+        points.append(point)
+    return points
+
+
+# Function to generate the input vectors of an operation and the expected results
+def generate_vectors(curve, operation, count, rng):
+    vectors = []
+    points = random_points(curve, count + 1, rng)
+    for i in range(count):
+        if operation == 'checkAddPoint':
+            p1, p2 = points[i], points[i+1]
+            expected = curve.add_points(p1, p2)
+            vectors.append(((p1.x, p1.y, p2.x, p2.y), (expected.x, expected.y)))
+        elif operation == 'checkDoublePoint':
+            p = points[i]
+            expected = curve.add_points(p, p)
+            vectors.append(((p.x, p.y), (expected.x, expected.y)))
+        elif operation == 'checkScalarMultiplication':
+            k = rng.randrange(1, curve.n)
+            expected = curve.multiply_point(k, points[i])
+            vectors.append(((k, points[i].x, points[i].y), (expected.x, expected.y)))
+        elif operation == 'checkInterleavedScalarMultiplication':
+            k1 = rng.randrange(1, curve.n)
+            k2 = rng.randrange(1, curve.n)
+            pk = points[i]
+            expected = curve.add_points(curve.multiply_point(k1, curve.G), curve.multiply_point(k2, pk))
+            vectors.append(((k1, k2, pk.x, pk.y), (expected.x % curve.n,)))
+    return vectors
+
+
+# Function to send a JSON-RPC batch in a single HTTP request, it returns the responses
+def post_batch(rpc, requests_batch, timeout=300):
+    request = urllib.request.Request(rpc, data=json.dumps(requests_batch).encode(), headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+# Function to send a list of eth_call requests, it returns the list of the results (hex strings or errors)
+def batch_eth_call(w3, address, datas, batch_size=500, rpc=None):
+    results = []
+    call = {'to': address}
+    if w3 is not None and w3.eth.default_account:
+        # The requests of a batch do not go through the middlewares filling the sender
+        call['from'] = w3.eth.default_account
+    for start in range(0, len(datas), batch_size):
+        requests_batch = [
+            {
+                'jsonrpc': '2.0',
+                'id': start + i,
+                'method': 'eth_call',
+                'params': [dict(call, data=data), 'latest']
+            }
+            for i, data in enumerate(datas[start:start + batch_size])
+        ]
+        if rpc is not None:
+            # A single HTTP request carries the whole batch
+            responses = post_batch(rpc, requests_batch)
+        else:
+            responses = w3.provider.make_batch_request(requests_batch)
+        responses = sorted(responses, key=lambda response: response['id'])
+        for response in responses:
+            if 'error' in response:
+                results.append(Exception(response['error']))
+            else:
+                results.append(response['result'])
+    return results
+
+
+# Function to run the differential test of an operation, it returns the list of the mismatches
+def run_operation(w3, contract, curve, operation, count, rng, batch_size, rpc):
+    vectors = generate_vectors(curve, operation, count, rng)
+    datas = [contract.encodeABI(fn_name=operation, args=list(inputs)) for inputs, _ in vectors]
+    output_types = [output['type'] for output in contract.get_function_by_name(operation).abi['outputs']]
+
+    results = batch_eth_call(w3, contract.address, datas, batch_size, rpc)
+    mismatches = []
+    for (inputs, expected), result in zip(vectors, results):
+        if isinstance(result, Exception):
+            mismatches.append((operation, inputs, expected, result))
+            continue
+        got = tuple(w3.codec.decode(output_types, Web3.to_bytes(hexstr=result)))
+        if got != expected:
+            mismatches.append((operation, inputs, expected, got))
+    return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Differential testing of EllipticCurveMaths.sol against the Python implementation")
+    parser.add_argument('--curve', default='secp256k1', choices=list(CURVES.keys()), help="curve imported by EllipticCurveMaths.sol")
+    parser.add_argument('--count', type=int, default=1000, help="number of input vectors per operation")
+    parser.add_argument('--batch-size', type=int, default=500, help="eth_call requests per JSON-RPC batch")
+    parser.add_argument('--rpc', help="HTTP endpoint of a local EVM (the in-process EVM is used otherwise)")
+    parser.add_argument('--address', help="address of DifferentialECC on the endpoint (deployed if omitted)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the generated inputs")
+    args = parser.parse_args()
+
+    curve = CURVES[args.curve]
+    rng = random.Random(args.seed)
+
+    if args.rpc is not None:
+        from local_evm import load_artifact, deploy
+        w3 = Web3(Web3.HTTPProvider(args.rpc))
+        if args.address is not None:
+            contract = w3.eth.contract(address=args.address, abi=load_artifact('DifferentialECC')['abi'])
+        else:
+            w3.eth.default_account = w3.eth.accounts[0]
+            contract = deploy(w3, 'DifferentialECC')
+    else:
+        from local_evm import local_web3, deploy
+        w3 = local_web3()
+        contract = deploy(w3, 'DifferentialECC')
+
+    total_mismatches = []
+    for operation in OPERATIONS:
+        start = time.perf_counter()
+        mismatches = run_operation(w3, contract, curve, operation, args.count, rng, args.batch_size, args.rpc)
+        print("{:<40} {} vectors, {} mismatches ({:.1f}s)".format(operation, args.count, len(mismatches), time.perf_counter() - start))
+        total_mismatches.extend(mismatches)
+
+    for operation, inputs, expected, got in total_mismatches[:20]:
+        print("MISMATCH {} inputs={} expected={} got={}".format(operation, inputs, expected, got))
+    if total_mismatches:
+        sys.exit(1)
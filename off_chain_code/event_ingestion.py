@@ -0,0 +1,181 @@
+import json
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Optional
+from eth_utils import event_abi_to_log_topic
+
+#############################################################
+# This file contains the ingestion stage of the off-chain component.
+# The logs emitted by the SourceSmartContract (eventInterChainTransactionSyncDataStart)
+# and by the TargetSmartContract (eventInterChainTransactionSyncDataExecuted)
+# are pulled in block-range batches with eth_getLogs while the component is
+# catching up with the chain. Once the head is reached, the ingestion switches
+# to a log filter installed on the node and only polls for new entries.
+# Decoded requests are pushed into a bounded queue: when the signing
+# coordinator falls behind the queue is full and the ingestion blocks.
+# With a journal, the last block read is recorded after each batch and a
+# restarted ingestor resumes from the next block instead of rescanning
+# the history.
+#############################################################
+
+SOURCE_EVENTS = ['eventInterChainTransactionSyncDataStart']
+TARGET_EVENTS = ['eventInterChainTransactionSyncDataExecuted']
+
+# Class of an inter-chain request read from the blockchain
+@dataclass
+class InterChainRequest:
+    event: str
+    sender: str
+    nonce: int
+    message: str
+    value: Optional[int]
+    block_number: int
+    tx_hash: str
+    log_index: int
+
+
+# Function to extract the value from the message emitted by the smart contracts
+def parse_message_value(message):
+    try:
+        return int(json.loads(message)['body']['content']['value'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+# Class implementing the ingestion thread for a single smart contract
+class EventIngestor(threading.Thread):
+    def __init__(self, w3, contract, event_names, from_block=0, batch_size=2000,
+                 max_pending=1000, poll_interval=1, confirmations=0, output=None, max_backoff=30,
+                 journal=None, chain=None):
+        super().__init__(daemon=True)
+        self.w3 = w3
+        self.contract = contract
+        self.batch_size = batch_size # number of blocks requested with a single eth_getLogs
+        self.poll_interval = poll_interval # seconds between two polls of the log filter
+        self.confirmations = confirmations # blocks to wait before reading a log
+        self.max_backoff = max_backoff # max seconds between two attempts after an error
+        self.journal = journal # RelayJournal storing the checkpoint (optional)
+        self.chain = chain # name of the checkpoint in the journal, one for each ingestor
+        if journal is not None and journal.last_block(chain) is not None:
+            from_block = max(from_block, journal.last_block(chain) + 1)
+        self.next_block = from_block
+        self.output = output if output is not None else queue.Queue(maxsize=max_pending)
+        self.stop_event = threading.Event()
+        self.log_filter = None
+
+        # Map the topic of each event to the event object used to decode it
+        self.decoders = dict()
+        for name in event_names:
+            event = contract.events[name]()
+            self.decoders[event_abi_to_log_topic(event.abi)] = event
+
+    # Function to get the last block that can be read
+    def safe_head(self):
+        return self.w3.eth.block_number - self.confirmations
+
+    # Function to build the parameters of eth_getLogs and eth_newFilter
+    def filter_params(self, from_block, to_block):
+        return {
+            'address': self.contract.address,
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'topics': [list(self.decoders.keys())]
+        }
+
+    # Function to decode a list of raw logs
+    def decode_logs(self, logs):
+        requests = []
+        for log in logs:
+            topic = bytes(log['topics'][0])
+            if topic not in self.decoders:
+                continue
+            decoded = self.decoders[topic].process_log(log)
+            requests.append(InterChainRequest(
+                event=decoded['event'],
+                sender=decoded['args']['from'],
+                nonce=decoded['args']['nonce'],
+                message=decoded['args']['message'],
+                value=parse_message_value(decoded['args']['message']),
+                block_number=decoded['blockNumber'],
+                tx_hash=decoded['transactionHash'].hex(),
+                log_index=decoded['logIndex']
+            ))
+        requests.sort(key=lambda request: (request.block_number, request.log_index))
+        return requests
+
+    # Function to record the last block read in the journal
+    def checkpoint(self):
+        if self.journal is not None:
+            self.journal.record_block(self.chain, self.next_block - 1)
+
+    # Function to push the requests into the queue, it blocks while the queue is full
+    def publish(self, requests):
+        for request in requests:
+            while not self.stop_event.is_set():
+                try:
+                    self.output.put(request, timeout=self.poll_interval)
+                    break
+                except queue.Full:
+                    continue
+
+    # Function to read the logs in batches up to the safe head.
+    # It returns the number of requests read
+    def catch_up(self):
+        count = 0
+        head = self.safe_head()
+        while self.next_block <= head and not self.stop_event.is_set():
+            to_block = min(self.next_block + self.batch_size - 1, head)
+            logs = self.w3.eth.get_logs(self.filter_params(self.next_block, to_block))
+            requests = self.decode_logs(logs)
+            self.publish(requests)
+            if self.stop_event.is_set():
+                # The batch may be published only in part: it is read again after a restart
+                break
+            count += len(requests)
+            self.next_block = to_block + 1
+            self.checkpoint()
+        return count
+
+    # Function to install the log filter once the head is reached.
+    # The blocks mined before the filter was installed are read again with eth_getLogs
+    def subscribe(self):
+        self.log_filter = self.w3.eth.filter(self.filter_params(self.next_block, 'latest'))
+        self.catch_up()
+
+    # Function to read the new entries of the log filter.
+    # It returns the number of requests read
+    def poll(self):
+        logs = self.log_filter.get_new_entries()
+        # Skip the logs already read by catch_up
+        requests = [request for request in self.decode_logs(logs) if request.block_number >= self.next_block]
+        self.publish(requests)
+        if requests:
+            self.next_block = max(self.next_block, requests[-1].block_number + 1)
+            self.checkpoint()
+        return len(requests)
+
+    # The thread exits only on stop: after an error (e.g. the filter dropped by the node
+    # or the node unreachable) the logs are read again with eth_getLogs and the filter is
+    # installed again, retrying with an exponential backoff until it succeeds
+    def run(self):
+        delay = self.poll_interval
+        while not self.stop_event.is_set():
+            try:
+                if self.log_filter is not None:
+                    self.poll()
+                else:
+                    self.catch_up()
+                    # Logs with confirmations are read only through eth_getLogs
+                    if self.confirmations == 0:
+                        self.subscribe()
+                delay = self.poll_interval
+            except Exception as e:
+                print("Event ingestion error: ", e)
+                self.log_filter = None
+                delay = min(delay * 2, self.max_backoff)
+            self.stop_event.wait(delay)
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
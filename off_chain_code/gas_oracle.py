@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import deque
+
+#############################################################
+# This class implements a fee/gas oracle for the off-chain components.
+# The gas price is cached and refreshed on a timer by a background thread
+# (woken up early when a new block is notified), while the gas needed by each contract function is kept as
+# a bounded estimate computed on the gas used by the last transactions.
+# A live estimate_gas call is performed only when no estimate is available
+# or when a transaction sent with the cached estimate has failed.
+#############################################################
+class GasOracle:
+    def __init__(self, w3, refresh_interval=15, safety_margin=0.1, window=32, gas_cap=None):
+        self.w3 = w3
+        self.refresh_interval = refresh_interval # seconds between two gas price refreshes
+        self.safety_margin = safety_margin # fraction of gas added to the estimates
+        self.window = window # number of samples kept for each function
+        self.gas_cap = gas_cap # optional upper bound for the estimates
+        self.lock = threading.Lock()
+        self.samples = dict() # function name -> last gas values observed
+        self.price = None
+        self.price_time = 0
+        self.last_block = None
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event() # set to refresh the price before the next tick
+        self.refresher = None
+
+    # Function to start the background thread refreshing the gas price
+    def start(self):
+        if self.refresher is not None:
+            return
+        self.refresh_gas_price()
+        self.refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+        self.refresher.start()
+
+    # Function to stop the background thread
+    def stop(self):
+        self.stop_event.set()
+        self.wake_event.set()
+        if self.refresher is not None:
+            self.refresher.join()
+            self.refresher = None
+
+    def _refresh_loop(self):
+        while True:
+            self.wake_event.wait(self.refresh_interval)
+            self.wake_event.clear()
+            if self.stop_event.is_set():
+                return
+            try:
+                self.refresh_gas_price()
+            except Exception as e:
+                # Keep the last known price, it will be refreshed at the next tick
+                print("Gas price refresh failed: ", e)
+
+    # Function to read the gas price from the node and store it
+    def refresh_gas_price(self):
+        price = self.w3.eth.gas_price
+        with self.lock:
+            self.price = price
+            self.price_time = time.monotonic()
+        return price
+
+    # Function to notify the oracle that a new block has been mined. It does not
+    # call the node: the refresher thread is woken up, without it the cached
+    # price is marked as expired and read again by the next gas_price()
+    def on_new_block(self, block_number):
+        with self.lock:
+            if self.last_block is not None and block_number <= self.last_block:
+                return
+            self.last_block = block_number
+            if self.refresher is None:
+                self.price_time = 0
+                return
+        self.wake_event.set()
+
+    # Function to get the cached gas price, it is read from the node
+    # only if it has never been read or the cached value is expired
+    def gas_price(self):
+        with self.lock:
+            price = self.price
+            expired = time.monotonic() - self.price_time > self.refresh_interval
+        if price is None or (expired and self.refresher is None):
+            price = self.refresh_gas_price()
+        return price
+
+    # Function to store the gas used (or estimated) by a contract function
+    def record_gas(self, name, gas):
+        with self.lock:
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.window)
+            self.samples[name].append(gas)
+
+    # Function to drop the estimate of a contract function,
+    # the next request will perform a live estimate
+    def invalidate(self, name):
+        with self.lock:
+            self.samples.pop(name, None)
+
+    # Function to get the cached estimate of a contract function
+    # (max of the observed values plus the safety margin)
+    def cached_estimate(self, name):
+        with self.lock:
+            values = self.samples.get(name)
+            if not values:
+                return None
+            gas = int(max(values) * (1 + self.safety_margin))
+        if self.gas_cap is not None:
+            gas = min(gas, self.gas_cap)
+        return gas
+
+    # Function to get the gas for a contract function call. The live estimate
+    # is performed only if no cached estimate is available for the function
+    def estimate_gas(self, name, contract_function, tx_params):
+        gas = self.cached_estimate(name)
+        if gas is not None:
+            return gas
+        self.record_gas(name, contract_function.estimate_gas(tx_params))
+        return self.cached_estimate(name)
+
+    # Function to update the oracle with the receipt of a transaction.
+    # Failed transactions invalidate the estimate of the function
+    def observe_receipt(self, name, receipt):
+        if receipt.status == 0:
+            self.invalidate(name)
+            return
+        self.record_gas(name, receipt.gasUsed)
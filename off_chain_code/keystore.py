@@ -0,0 +1,148 @@
+import os
+import struct
+import hashlib
+import secrets
+from dataclasses import dataclass
+from typing import List, Tuple
+from Crypto.Cipher import AES
+from threshold_core.curve import Point
+
+################################################################################
+# FILE DESCRIPTION:
+# This file contains the persistent keystore of the threshold key: the share
+# of each node, the public keys of the shares and the global public key.
+# The keystore is written once after key_gen and loaded at startup, so a
+# restart does not need a new key generation nor a new updatePublicKey.
+#
+# Binary layout (big endian):
+#   header:  magic 'TKS' | version (1 byte) | log2 scrypt N (1 byte) | scrypt r (1 byte)
+#            | scrypt p (1 byte) | salt (16 bytes) | AES-GCM nonce (12 bytes)
+#   payload: AES-GCM(ciphertext) | tag (16 bytes), the header is authenticated
+#            with the payload
+#   plaintext: epoch (4 bytes) | coordinate size L (1 byte) | num_nodes (2 bytes)
+#            | threshold (2 bytes) | global pk (2L bytes)
+#            | num_nodes x [index (2 bytes) | share (L bytes) | pk (2L bytes)]
+#
+# The epoch is incremented each time a new key is saved.
+# AES-GCM is provided by pycryptodome (listed in requirements.txt).
+################################################################################
+
+MAGIC = b'TKS'
+VERSION = 1
+HEADER = struct.Struct('>3sBBBB16s12s')
+BODY = struct.Struct('>IBHH')
+TAG_SIZE = 16
+
+# Default scrypt parameters: N = 2^14, r = 8, p = 1
+SCRYPT_LOG_N = 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+class KeystoreError(Exception):
+    pass
+
+
+# Class of the content of the keystore
+@dataclass
+class ThresholdKey:
+    epoch: int
+    threshold: int
+    global_pk: Point
+    shares: List[Tuple[int, int]]
+    public_keys: List[Point]
+
+
+def derive_key(password, salt, log_n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=1 << log_n, r=r, p=p, maxmem=1 << 26, dklen=32)
+
+
+def encode_key(key, size):
+    body = [BODY.pack(key.epoch, size, len(key.shares), key.threshold)]
+    body.append(key.global_pk.x.to_bytes(size, 'big') + key.global_pk.y.to_bytes(size, 'big'))
+    for (index, share), pk in zip(key.shares, key.public_keys):
+        body.append(struct.pack('>H', index))
+        body.append(share.to_bytes(size, 'big') + pk.x.to_bytes(size, 'big') + pk.y.to_bytes(size, 'big'))
+    return b''.join(body)
+
+
+def decode_key(data):
+    epoch, size, num_nodes, threshold = BODY.unpack_from(data)
+    if len(data) != BODY.size + 2 * size + num_nodes * (2 + 3 * size):
+        raise KeystoreError("Corrupted keystore")
+
+    def read_int(offset):
+        return int.from_bytes(data[offset:offset+size], 'big')
+
+    offset = BODY.size
+    global_pk = Point(x=read_int(offset), y=read_int(offset+size))
+    offset += 2 * size
+    shares = []
+    public_keys = []
+    for _ in range(num_nodes):
+        index, = struct.unpack_from('>H', data, offset)
+        offset += 2
+        shares.append((index, read_int(offset)))
+        public_keys.append(Point(x=read_int(offset+size), y=read_int(offset+2*size)))
+        offset += 3 * size
+    return ThresholdKey(epoch, threshold, global_pk, shares, public_keys)
+
+
+# Function to save the threshold key, the file is replaced atomically
+def save_keystore(path, key, password, curve, log_n=SCRYPT_LOG_N, r=SCRYPT_R, p=SCRYPT_P):
+    size = (curve.p.bit_length() + 7) // 8
+    salt = secrets.token_bytes(16)
+    nonce = secrets.token_bytes(12)
+    header = HEADER.pack(MAGIC, VERSION, log_n, r, p, salt, nonce)
+
+    cipher = AES.new(derive_key(password, salt, log_n, r, p), AES.MODE_GCM, nonce=nonce)
+    cipher.update(header)
+    ciphertext, tag = cipher.encrypt_and_digest(encode_key(key, size))
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as keystore_file:
+        keystore_file.write(header + ciphertext + tag)
+        keystore_file.flush()
+        os.fsync(keystore_file.fileno())
+    os.replace(tmp_path, path)
+
+
+# Function to load the threshold key, it raises KeystoreError if the password is wrong or the file is corrupted
+def load_keystore(path, password):
+    with open(path, 'rb') as keystore_file:
+        data = keystore_file.read()
+    if len(data) < HEADER.size + TAG_SIZE:
+        raise KeystoreError("Corrupted keystore")
+    magic, version, log_n, r, p, salt, nonce = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise KeystoreError("Not a keystore file")
+    if version != VERSION:
+        raise KeystoreError("Unsupported keystore version: {}".format(version))
+
+    cipher = AES.new(derive_key(password, salt, log_n, r, p), AES.MODE_GCM, nonce=nonce)
+    cipher.update(data[:HEADER.size])
+    try:
+        plaintext = cipher.decrypt_and_verify(data[HEADER.size:-TAG_SIZE], data[-TAG_SIZE:])
+    except ValueError:
+        raise KeystoreError("Wrong password or corrupted keystore")
+    return decode_key(plaintext)
+
+
+# Function to load the threshold key or to generate and save a new one.
+# It returns (key, True) if a new key has been generated
+def load_or_generate(path, password, curve, num_nodes, threshold, key_gen):
+    if os.path.exists(path):
+        key = load_keystore(path, password)
+        if len(key.shares) == num_nodes and key.threshold == threshold:
+            return key, False
+        epoch = key.epoch + 1
+    else:
+        epoch = 1
+
+    secret = secrets.randbelow(curve.n)
+    shares, public_keys = key_gen(secret, num_nodes, threshold, curve)
+    if shares is None:
+        raise KeystoreError("Key generation failed")
+    key = ThresholdKey(epoch, threshold, curve.multiply_point(secret, curve.G), shares, public_keys)
+    save_keystore(path, key, password, curve)
+    return key, True
@@ -0,0 +1,136 @@
+import csv
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+#############################################################
+# This file contains the latency instrumentation of the off-chain component.
+# Each phase of a signing round (message creation, nonce commitment, barrier
+# wait, partial signing, combining, gas estimation, transaction signing,
+# submission, confirmation) is timed with a high-resolution clock. The
+# durations are aggregated into rolling histograms (p50/p99) and streamed
+# to a CSV file by a background thread while the process runs.
+#############################################################
+
+# Class implementing a rolling histogram on the last samples
+class RollingHistogram:
+    def __init__(self, window=1024):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    # Function to compute the percentile p (0 < p <= 100) on the samples in the window
+    def percentile(self, p):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+        return ordered[index]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'max': max(self.samples) if self.samples else None
+        }
+
+
+# Class implementing a CSV file written incrementally by a background thread.
+# The rows are appended: after a restart the rows already written are kept
+# and the header is written only if the file is new
+class CsvStream:
+    def __init__(self, path, fieldnames, flush_interval=1.0):
+        self.path = path
+        self.fieldnames = fieldnames
+        self.flush_interval = flush_interval # max seconds a row waits before being written
+        self.rows = queue.Queue()
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    def write(self, row):
+        self.rows.put(row)
+
+    def _write_loop(self):
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, 'a', newline='') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=self.fieldnames, extrasaction='ignore')
+            if new_file:
+                writer.writeheader()
+                csv_file.flush()
+            closing = False
+            while not closing:
+                try:
+                    rows = [self.rows.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+                while not self.rows.empty():
+                    rows.append(self.rows.get_nowait())
+                closing = None in rows
+                writer.writerows(row for row in rows if row is not None)
+                csv_file.flush()
+
+    # Function to write the pending rows and close the file
+    def close(self):
+        self.rows.put(None)
+        self.writer.join()
+
+
+# Class collecting the duration of the phases of the signing rounds
+class LatencyRecorder:
+    def __init__(self, path=None, window=1024):
+        self.window = window
+        self.lock = threading.Lock()
+        self.histograms = dict() # phase -> rolling histogram
+        self.stream = None
+        if path is not None:
+            self.stream = CsvStream(path, ['round', 'phase', 'thread', 'start_ns', 'duration_ms'])
+
+    # Function to record the duration (in nanoseconds) of a phase
+    def record(self, phase, start_ns, duration_ns, round_id=None):
+        duration_ms = duration_ns / 1e6
+        with self.lock:
+            if phase not in self.histograms:
+                self.histograms[phase] = RollingHistogram(self.window)
+            self.histograms[phase].add(duration_ms)
+        if self.stream is not None:
+            self.stream.write({
+                'round': round_id,
+                'phase': phase,
+                'thread': threading.current_thread().name,
+                'start_ns': start_ns,
+                'duration_ms': duration_ms
+            })
+
+    # Context manager to time a phase
+    @contextmanager
+    def span(self, phase, round_id=None):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(phase, start, time.perf_counter_ns() - start, round_id)
+
+    # Function to get the statistics (in milliseconds) of each phase
+    def summary(self):
+        with self.lock:
+            return {phase: histogram.summary() for phase, histogram in self.histograms.items()}
+
+    # Function to print the statistics of each phase
+    def print_summary(self):
+        for phase, stats in self.summary().items():
+            print("{:<20} count={:<6} p50={:.3f}ms p99={:.3f}ms max={:.3f}ms".format(
+                phase, stats['count'], stats['p50'], stats['p99'], stats['max']))
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
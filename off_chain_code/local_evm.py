@@ -0,0 +1,113 @@
+import os
+import json
+import threading
+from web3 import Web3, EthereumTesterProvider
+from web3.providers import BaseProvider
+import config
+
+################################################################################
+# FILE DESCRIPTION:
+# This file contains the functions to run the smart contracts on an in-process
+# EVM (eth-tester with the py-evm backend) instead of a Besu network.
+# The contracts are deployed from the artifacts produced by `truffle compile`,
+# the libraries referenced by the bytecode are deployed and linked on demand.
+# The requests to the in-process EVM are serialised, so the same Web3
+# instance can be shared by several threads. A list of JSON-RPC requests can
+# be run as a batch (make_batch_request), holding the EVM for the whole list.
+# Extra packages needed: pip install "web3[tester]"
+################################################################################
+
+BUILD_PATH = os.path.abspath(config.build_path)
+
+
+# Provider executing the requests of a provider one at a time
+class SerializedProvider(BaseProvider):
+    def __init__(self, provider):
+        super().__init__()
+        self.provider = provider
+        self.middlewares = provider.middlewares
+        self.lock = threading.Lock()
+
+    def make_request(self, method, params):
+        with self.lock:
+            return self.provider.make_request(method, params)
+
+    # Function to run a list of JSON-RPC requests (dicts with id, method and params)
+    # in a single session of the EVM, it returns the responses with the ids of the requests.
+    # As in a JSON-RPC batch, a failed request is an error response and does not stop the others.
+    # The middlewares are not applied: the requests must be complete (e.g. 'from' of eth_call)
+    def make_batch_request(self, requests):
+        responses = []
+        with self.lock:
+            for request in requests:
+                try:
+                    response = dict(self.provider.make_request(request['method'], request['params']))
+                except Exception as e:
+                    response = {'jsonrpc': '2.0', 'error': {'code': -32000, 'message': str(e)}}
+                response['id'] = request['id']
+                responses.append(response)
+        return responses
+
+    def is_connected(self, show_traceback=False):
+        return self.provider.is_connected(show_traceback)
+
+
+# Function to create a Web3 instance connected to an in-process EVM
+def local_web3():
+    w3 = Web3(SerializedProvider(EthereumTesterProvider()))
+    w3.eth.default_account = w3.eth.accounts[0]
+    return w3
+
+
+# Function to load the abi and the bytecode of a compiled contract
+def load_artifact(name, build_path=BUILD_PATH):
+    with open(os.path.join(build_path, name + '.json'), 'r') as json_file:
+        compiled_contract = json.load(json_file)
+    return {'abi': compiled_contract['abi'], 'bytecode': compiled_contract['bytecode']}
+
+
+# Function to find the names of the libraries to link in a bytecode.
+# Truffle placeholders are 40 characters long: __LibraryName_______...
+def find_libraries(bytecode):
+    libraries = []
+    index = bytecode.find('__')
+    while index != -1:
+        name = bytecode[index+2:index+40].rstrip('_')
+        if name not in libraries:
+            libraries.append(name)
+        index = bytecode.find('__', index + 40)
+    return libraries
+
+
+# Function to replace the library placeholders with the library addresses
+def link_bytecode(bytecode, libraries):
+    for name, address in libraries.items():
+        placeholder = ('__' + name).ljust(40, '_')
+        bytecode = bytecode.replace(placeholder, address[2:].lower())
+    return bytecode
+
+
+# Function to deploy a compiled contract, it returns the contract object.
+# The libraries already deployed can be passed as name -> address.
+# On a node without unlocked accounts (e.g. Besu) the transactions are signed with private_key
+def deploy(w3, name, *args, libraries=None, build_path=BUILD_PATH, private_key=None):
+    artifact = load_artifact(name, build_path)
+    libraries = libraries if libraries is not None else dict()
+    for library in find_libraries(artifact['bytecode']):
+        if library not in libraries:
+            libraries[library] = deploy(w3, library, libraries=libraries, build_path=build_path, private_key=private_key).address
+    bytecode = link_bytecode(artifact['bytecode'], libraries)
+
+    contract = w3.eth.contract(abi=artifact['abi'], bytecode=bytecode)
+    if private_key is None:
+        tx_hash = contract.constructor(*args).transact({'from': w3.eth.default_account})
+    else:
+        account = w3.eth.account.from_key(private_key)
+        raw_tx = contract.constructor(*args).build_transaction({
+            'from': account.address,
+            'nonce': w3.eth.get_transaction_count(account.address)
+        })
+        signed_tx = w3.eth.account.sign_transaction(raw_tx, private_key=private_key)
+        tx_hash = w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    return w3.eth.contract(address=receipt.contractAddress, abi=artifact['abi'])
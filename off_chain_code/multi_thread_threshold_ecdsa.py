@@ -4,14 +4,23 @@ sys.path.insert(1, '../threshold-ecdsa-in-off-chain-components/off_chain_code')
 import json
 import secrets
 from web3 import Web3
-from web3.middleware import geth_poa_middleware
+from web3.exceptions import TimeExhausted
 from dataclasses import dataclass
 from typing import Optional, List, Tuple
 from elliptic_curve_operations import Point, EllipticCurve, ecdsa_sign, ecdsa_verify
 from shamir_secret_sharing import generate_polynomial, evaluate_polynomial, share_secret, lagrange_coefficient
 from threshold_ecdsa_utils import key_gen, partial_ecdsa_sign, combine_partial_signatures
+from gas_oracle import GasOracle
+from receipt_tracker import ReceiptTracker
+from relay_journal import RelayJournal, SIGNED, SUBMITTED, CONFIRMED
+from latency_metrics import LatencyRecorder, CsvStream
+from curve_profiling import profile_operations
+from keystore import load_or_generate
+from signer_selection import LatencyAwareSelection
+from provider_pool import ChainPools
+from packed_encoding import verify_ecdsa_preimage, message_hash, pack_signature
+from contextlib import nullcontext
 import config
-import pandas as pd
 import threading
 import random
 import string
@@ -32,6 +41,13 @@ barrier = threading.Barrier(threshold) # Barrier to sinchronise the threads acti
 nonce_commitments = [] # Commitment of the nonce during threshold generation
 ids_signers = [] # ID of the off-chain threads
 transactions_data = [] # List of all transactions
+round_id = 0 # Number of the current signing round
+metrics = LatencyRecorder() # Timing of the phases of the signing rounds
+profile_curve = False # Set to True to count the curve operations of each round
+operation_counters = None # Counters of the curve operations (None if the profiling is disabled)
+signer_selection = LatencyAwareSelection() # Policy used to select the signers of each round
+round_started = None # Start of the current round (time.monotonic), used to measure the latency of the signers
+packed_calldata = False # Set to True to submit through verifyECDSAPacked (the contract must be compiled with the packed entry points)
 
 def get_random_string(length):
     # choose from all lowercase letter
@@ -39,6 +55,24 @@ def get_random_string(length):
     result_str = ''.join(random.choice(letters) for i in range(length))
     return result_str
 
+# Function to get the receipt of a round submitted before a restart. If the transaction
+# is not mined, the stored raw transaction is broadcast again (a node that already knows
+# it rejects the duplicate). It returns None if the transaction is not mined before the
+# timeout (e.g. it was never broadcast and its nonce has been used): the round is signed again
+def resume_submitted(w3, tracker, tx_hash, raw_tx, timeout=120):
+    tx_hash = Web3.to_bytes(hexstr=tx_hash)
+    receipt = tracker.recover(tx_hash)
+    if receipt is not None:
+        return receipt
+    try:
+        w3.eth.send_raw_transaction(raw_tx)
+    except Exception as e:
+        print("Broadcast of {} failed: {}".format(Web3.to_hex(tx_hash), e))
+    try:
+        return tracker.wait(tx_hash, timeout)
+    except TimeExhausted:
+        return None
+
 #############################################################
 # This class implement the secondary nodes logic.
 # Each secondary node, after receiving the message to be signed
@@ -54,7 +88,7 @@ class SecondaryNode(threading.Thread):
         self.curve = curve
 
     def run(self):
-        global hash, hash_result, nonce_commitments, partial_sign, ids_signers
+        global hash, hash_result, nonce_commitments, partial_sign, ids_signers, metrics, round_id
 
         while True:
             new_message_event.wait()  # Wait for a new message to process
@@ -63,22 +97,28 @@ class SecondaryNode(threading.Thread):
                 break
 
             if active_threads[self.index]:  # Only process if this thread is selected
-                # Compute the hash using message, public_secret, and random_secret
-                nonce = secrets.randbelow(curve.n)
+                with metrics.span('nonce_commitment', round_id):
+                    # Compute the hash using message, public_secret, and random_secret
+                    nonce = secrets.randbelow(curve.n)
 
-                # Share the individual commitments with the other threads
-                with thread_lock:
-                    nonce_commitments.append((self.index+1, nonce))
-                    #hash_result[self.index] = hash
+                    # Share the individual commitments with the other threads
+                    with thread_lock:
+                        nonce_commitments.append((self.index+1, nonce))
+                        #hash_result[self.index] = hash
+                commitment_time = time.monotonic() - round_started
 
                 # Compute the global k and generate the partial signature
-                barrier.wait()
-                k = sum(s[1] for s in nonce_commitments) % self.curve.n
+                with metrics.span('barrier_wait', round_id):
+                    barrier.wait()
+                signing_start = time.monotonic()
+                with metrics.span('partial_signing', round_id):
+                    k = sum(s[1] for s in nonce_commitments) % self.curve.n
 
-                partial_sign = partial_ecdsa_sign(self.share[1], hash, k, self.curve)
+                    partial_sign = partial_ecdsa_sign(self.share[1], hash, k, self.curve)
                 with thread_lock:
                     partial_signatures.append((self.index+1, partial_sign))
                     ids_signers.append(self.index+1)
+                signer_selection.report(self.index, commitment_time, time.monotonic() - signing_start)
 
                 with condition:
                     condition.notify()  # Notify the primary thread that computation is done
@@ -90,66 +130,138 @@ class SecondaryNode(threading.Thread):
 # sending it to the secondary nodes, collecting the partial signatures and
 # calculating the threshold signature
 #############################################################
-def primary_thread(global_pk, curve, w3, verify_contract, account):
-    global hash, hash_result, active_threads, nonce_commitments, partial_signatures, ids_signers, transactions_data
+def primary_thread(global_pk, curve, w3, verify_contract, account, gas_oracle, journal, network, tracker):
+    global hash, hash_result, active_threads, nonce_commitments, partial_signatures, ids_signers, transactions_data, round_id, round_started
+    # Statistics of the transactions are written while the process runs. The first
+    # columns are those of the previous format (the first one is the round index)
+    statistics = CsvStream("verify_threshold_statistics.csv", [
+        '', 'tx_number', 'tx_hash', 'block', 'submission_time', 'validation_time', 'slippage', 'gas_used', 'confirmation_ms',
+        'scalar_multiplication', 'point_addition', 'point_doubling', 'modular_inversion', 'on_curve_check'
+    ])
     time.sleep(2)
     for i in range(250):  # Generate 10 messages
+        # Resume from the journal: skip the confirmed rounds and
+        # wait for the receipt of the rounds submitted before a restart
+        recorded = journal.request_state(network, account.address, i+1)
+        if recorded is not None and recorded[0] == CONFIRMED:
+            continue
+        if recorded is not None and recorded[0] == SUBMITTED:
+            txn_receipt = resume_submitted(w3, tracker, recorded[1], recorded[2])
+            if txn_receipt is not None:
+                journal.record_request(network, account.address, i+1, CONFIRMED)
+                continue
+            print("Round {} was not mined, it is signed again".format(i+1))
+
+        round_id = i+1
+        round_start = time.perf_counter_ns()
         # Generate a random message
-        val1 = secrets.randbelow(curve.n)
-        val2 = secrets.randbelow(curve.n)
-        str_val1 = get_random_string(10)
-        virtual_nonce = 10000
-
-        hash = Web3.solidity_keccak(['uint256', 'uint256', 'string', 'address', 'uint256'], [val1, val2, str_val1, account.address, virtual_nonce])
+        with metrics.span('message_creation', round_id):
+            val1 = secrets.randbelow(curve.n)
+            val2 = secrets.randbelow(curve.n)
+            str_val1 = get_random_string(10)
+            virtual_nonce = 10000
+
+            # The packed preimage is built once: it is hashed here and, with packed_calldata, sent as calldata with the signature
+            preimage = verify_ecdsa_preimage(virtual_nonce, val1, val2, str_val1, account.address)
+            hash = message_hash(preimage)
         # Reset hash_result for new round
         nonce_commitments = []
         partial_signatures = []
         ids_signers = []
 
-        # Select a random subset of 4 threads
-        selected_threads = random.sample(range(num_nodes-1), threshold)
+        # Select the signers: fast and healthy nodes are preferred
+        selected_threads = signer_selection.select(range(num_nodes-1), threshold)
         active_threads = [j in selected_threads for j in range(num_nodes-1)]
 
         # Signal secondary threads to start processing the new message
+        round_started = time.monotonic()
         new_message_event.set()
 
         # Wait for all selected secondary threads to complete
-        with condition:
-            while len(partial_signatures) != threshold:
-                condition.wait()
-
-        final_sign = combine_partial_signatures(partial_signatures, ids_signers, curve)
+        with metrics.span('signers_wait', round_id):
+            deadline_missed = signer_selection.deadline is None
+            with condition:
+                while len(partial_signatures) != threshold:
+                    if deadline_missed:
+                        condition.wait()
+                        continue
+                    remaining = round_started + signer_selection.deadline - time.monotonic()
+                    if remaining > 0:
+                        condition.wait(remaining)
+                        continue
+                    # The nodes without a commitment are evicted from the next rounds,
+                    # this round still needs their partial signatures
+                    with thread_lock:
+                        committed = [index for index, _ in nonce_commitments]
+                    for j in selected_threads:
+                        if j+1 not in committed:
+                            signer_selection.miss(j)
+                    deadline_missed = True
+
+        with metrics.span('combining', round_id):
+            final_sign = combine_partial_signatures(partial_signatures, ids_signers, curve)
         print("Final signature: ", final_sign)
+        journal.record_request(network, account.address, i+1, SIGNED)
 
         ##################################################################
         # Verify the signature on-chain
         ##################################################################
-        current_gas_price = w3.eth.gas_price
-        estimated_gas = verify_contract.functions.verifyECDSA(virtual_nonce, val1, val2, str_val1, final_sign[0], final_sign[1]).estimate_gas({'from': account.address})
-
-        raw_transaction = verify_contract.functions.verifyECDSA(virtual_nonce, val1, val2, str_val1, final_sign[0], final_sign[1]).build_transaction({
-            "from": account.address,
-            "nonce": w3.eth.get_transaction_count(account.address),
-            "gasPrice": current_gas_price,
-            "gas": estimated_gas+1000
-        })
-
-        signed_tx = w3.eth.account.sign_transaction(raw_transaction, private_key=prv_key)
+        # Gas price and gas estimate are served by the oracle cache
+        with metrics.span('gas_estimation', round_id):
+            # On secp256k1 the signature is verified through ecrecover using the recovery id
+            if packed_calldata:
+                function_name = 'verifyECDSAPacked'
+                verify_function = verify_contract.functions.verifyECDSAPacked(pack_signature(preimage, final_sign))
+            else:
+                function_name = 'verifyECDSARecover'
+                verify_function = verify_contract.functions.verifyECDSARecover(virtual_nonce, val1, val2, str_val1, final_sign[0], final_sign[1], final_sign[2])
+            current_gas_price = gas_oracle.gas_price()
+            estimated_gas = gas_oracle.estimate_gas(function_name, verify_function, {'from': account.address})
+
+        with metrics.span('transaction_signing', round_id):
+            raw_transaction = verify_function.build_transaction({
+                "from": account.address,
+                "nonce": w3.eth.get_transaction_count(account.address),
+                "gasPrice": current_gas_price,
+                "gas": estimated_gas+1000
+            })
+
+            signed_tx = w3.eth.account.sign_transaction(raw_transaction, private_key=prv_key)
+        # The hash of the signed transaction is known before sending it. The record is
+        # on disk before the transaction is sent: after a crash the round is not signed twice
+        journal.record_request(network, account.address, i+1, SUBMITTED, signed_tx.hash.hex(), Web3.to_hex(signed_tx.rawTransaction), sync=True)
+        # Track the transaction before sending it, the receipt is matched by the tracker
+        # on the new blocks and the block timestamp is read from its cache
+        tracker.track(signed_tx.hash)
         submission_time = int(time.time())
-        tx_hash = w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        txn_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        block = w3.eth.get_block(txn_receipt.blockNumber)
-        validation_time = block.timestamp
+        with metrics.span('submission', round_id):
+            tx_hash = w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+        confirmation_start = time.perf_counter_ns()
+        with metrics.span('confirmation', round_id):
+            txn_receipt = tracker.wait(tx_hash)
+        confirmation_ms = (time.perf_counter_ns() - confirmation_start) / 1e6
+        journal.record_request(network, account.address, i+1, CONFIRMED)
+        gas_oracle.observe_receipt(function_name, txn_receipt)
+        validation_time = tracker.block_timestamp(txn_receipt.blockNumber)
         slippage = validation_time - submission_time
+        metrics.record('round', round_start, time.perf_counter_ns() - round_start, round_id)
         transactions_data.append({
             'tx_number': i+1,
-            'tx_hash': tx_hash,
+            'tx_hash': tx_hash.hex(),
             'block': txn_receipt.blockNumber,
             'submission_time': submission_time,
             'validation_time': validation_time,
             'slippage': slippage,
+            'confirmation_ms': confirmation_ms,
             'gas_used': txn_receipt.gasUsed
         })
+        # Attach the curve operations performed during the round
+        if operation_counters is not None:
+            round_operations = operation_counters.snapshot(reset=True)
+            transactions_data[-1].update({operation: stats['count'] for operation, stats in round_operations.items()})
+        statistics.write({'': i, **transactions_data[-1]})
+        if round_id % 10 == 0:
+            metrics.print_summary()
         time.sleep(validation_time%7+5)
         print("Sleep for: ", validation_time%7+5)
 
@@ -157,29 +269,32 @@ def primary_thread(global_pk, curve, w3, verify_contract, account):
     message = None
     new_message_event.set()  # Signal the threads to exit
 
-    df = pd.DataFrame(transactions_data)
-    df.to_csv("verify_threshold_statistics.csv")
+    statistics.close()
+    metrics.print_summary()
 
 if __name__ == '__main__':
     ###############################################################
     # Specify the blockchain to interact with
     ###############################################################
     network='besu1'
-    path_compiled_verify_threshold = os.path.abspath('../threshold-ecdsa-in-off-chain-components/build/contracts/VerifyThresholdECDSA.json')
+    path_compiled_verify_threshold = os.path.join(os.path.abspath(config.build_path), 'VerifyThresholdECDSA.json')
     path_address = os.path.abspath('../threshold-ecdsa-in-off-chain-components/contractAddresses/'+network+'/addresses.json')
 
-    # websoket connection for the sepcific blockchain
-    websocket = config.ws_besu_1
     # prv_key related to the specific conenction
     prv_key = config.besu_1_sk
 
     ################################################################
+    # Open warm connections to all the endpoints of the network in
+    # config.py: requests are sent to the fastest healthy endpoint
+    # of the network and fail over to the others.
+    # The verifications of this process run on a single chain, the
+    # pool of the other network is not opened.
     # NOTA: For blockchains that use PoA-type consensus algorithms,
-    # it is necessary to inject the middleware_onion to avoid errors
+    # the pool injects the middleware_onion to avoid errors
     # when reading the blocks
     ################################################################
-    w3 = Web3(Web3.WebsocketProvider(websocket[0]))
-    w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+    chains = ChainPools({network: config.networks[network]}).start()
+    w3 = chains[network]
 
     account = w3.eth.account.from_key(prv_key)
     ##########################################################################
@@ -209,38 +324,64 @@ if __name__ == '__main__':
         h=1
     )
 
-    secret = secrets.randbelow(curve.n)
-    shares, public_keys = key_gen(secret, num_nodes, threshold, curve)
-    global_pk = curve.multiply_point(secret, curve.G)
+    # Load the shares and the global public key from the keystore,
+    # the key generation is executed only if the keystore does not exist
+    key, generated = load_or_generate('threshold_keystore_'+network+'.bin', config.keystore_password, curve, num_nodes, threshold, key_gen)
+    shares, public_keys, global_pk = key.shares, key.public_keys, key.global_pk
 
     ##############################################################################
     # Update the public key stored on the verify smart contract
+    # (only if it differs from the global public key)
     ##############################################################################
-    current_gas_price = w3.eth.gas_price
-    estimated_gas = verify_contract.functions.updatePublicKey(global_pk.x, global_pk.y).estimate_gas({'from': account.address})
-    estimated_gas
-    raw_tx = verify_contract.functions.updatePublicKey(global_pk.x, global_pk.y).build_transaction({
-        "from": account.address,
-        "nonce": w3.eth.get_transaction_count(account.address),
-        "gasPrice": current_gas_price,
-        "gas": estimated_gas+1000
-    })
-    signed_tx = w3.eth.account.sign_transaction(raw_tx, private_key=prv_key)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-
-    # Create and start secondary threads
-    threads = []
-
-    for i in range(num_nodes-1):
-        thread = SecondaryNode(index=i, share=shares[i], public_key=public_keys[i], curve=curve)
-        thread.start()
-        threads.append(thread)
-
-    # Start primary thread
-    primary = threading.Thread(target=primary_thread, args=(global_pk, curve, w3, verify_contract, account))
-    primary.start()
-    primary.join()
-
-    # Join all secondary threads
-    for thread in threads:
-        thread.join()
+    if (verify_contract.functions.Px().call(), verify_contract.functions.Py().call()) != (global_pk.x, global_pk.y):
+        current_gas_price = w3.eth.gas_price
+        estimated_gas = verify_contract.functions.updatePublicKey(global_pk.x, global_pk.y).estimate_gas({'from': account.address})
+        raw_tx = verify_contract.functions.updatePublicKey(global_pk.x, global_pk.y).build_transaction({
+            "from": account.address,
+            "nonce": w3.eth.get_transaction_count(account.address),
+            "gasPrice": current_gas_price,
+            "gas": estimated_gas+1000
+        })
+        signed_tx = w3.eth.account.sign_transaction(raw_tx, private_key=prv_key)
+        tx_hash = w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+        w3.eth.wait_for_transaction_receipt(tx_hash)
+
+    # Stream the timing of the phases of each round
+    metrics = LatencyRecorder('verify_threshold_phases.csv')
+
+    # Open the journal used to resume the relay after a restart
+    journal = RelayJournal('relay_journal_'+network+'.db')
+
+    # Start the gas oracle used by the primary thread
+    gas_oracle = GasOracle(w3)
+    gas_oracle.start()
+
+    # Start the receipt tracker, the gas price is refreshed on each new block
+    tracker = ReceiptTracker(w3)
+    tracker.add_block_listener(gas_oracle.on_new_block)
+    tracker.start()
+
+    # Count the curve operations only if the profiling is enabled
+    profiling = profile_operations() if profile_curve else nullcontext()
+    with profiling as operation_counters:
+        # Create and start secondary threads
+        threads = []
+
+        for i in range(num_nodes-1):
+            thread = SecondaryNode(index=i, share=shares[i], public_key=public_keys[i], curve=curve)
+            thread.start()
+            threads.append(thread)
+
+        # Start primary thread
+        primary = threading.Thread(target=primary_thread, args=(global_pk, curve, w3, verify_contract, account, gas_oracle, journal, network, tracker))
+        primary.start()
+        primary.join()
+        tracker.stop()
+        gas_oracle.stop()
+        metrics.close()
+        journal.close()
+        chains.stop()
+
+        # Join all secondary threads
+        for thread in threads:
+            thread.join()
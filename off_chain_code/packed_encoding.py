@@ -0,0 +1,36 @@
+from eth_abi.packed import encode_packed
+from eth_utils import keccak
+
+#############################################################
+# This file contains the encoder of the packed entry points of
+# VerifyThresholdECDSA (verifyECDSAPacked and the inter-chain *Packed
+# functions). The preimage of the message hash is built once with
+# abi.encodePacked rules: its keccak256 is the hash signed by the nodes,
+# and the same bytes, followed by the signature, are the calldata argument.
+#
+# Layout of the argument: preimage | r (32 bytes) | s (32 bytes) | v (1 byte)
+#############################################################
+
+VERIFY_ECDSA_TYPES = ['uint256', 'uint256', 'string', 'address', 'uint256']
+INTER_CHAIN_TYPES = ['uint256', 'address', 'uint256']
+
+
+# Function to build the preimage of verifyECDSA, the sender must be the account sending the transaction
+def verify_ecdsa_preimage(nonce, val1, val2, val3, sender):
+    return encode_packed(VERIFY_ECDSA_TYPES, [val1, val2, val3, sender, nonce])
+
+
+# Function to build the preimage of the inter-chain verifications (execution and end)
+def inter_chain_preimage(nonce, sender, val):
+    return encode_packed(INTER_CHAIN_TYPES, [nonce, sender, val])
+
+
+# Function to compute the hash to sign from a preimage
+def message_hash(preimage):
+    return keccak(preimage)
+
+
+# Function to append the signature (r, s, v) to a preimage, v is 0 if the signature has no recovery id
+def pack_signature(preimage, sign):
+    v = sign[2] if len(sign) > 2 else 0
+    return preimage + sign[0].to_bytes(32, 'big') + sign[1].to_bytes(32, 'big') + bytes([v])
@@ -0,0 +1,200 @@
+import queue
+import threading
+import time
+from web3 import Web3
+from web3.providers import BaseProvider
+from web3.middleware import geth_poa_middleware
+
+#############################################################
+# This file contains the pool of the connections to the blockchain nodes.
+# Each network of config.py is a list of endpoints: the pool keeps warm
+# connections to all of them and is used as the provider of a Web3 instance,
+# so the off-chain components use it without changes.
+#
+# - Each endpoint has a small set of connections, a request takes a free
+#   connection: threads sharing the Web3 instance do not share a websocket.
+# - A background thread probes each endpoint (eth_blockNumber), keeping an
+#   EWMA of its latency. An endpoint is healthy if the probe succeeds and it
+#   is not behind the highest block seen by more than max_block_lag blocks.
+# - Requests are sent to the healthy endpoint with the lowest latency. If the
+#   connection fails (or times out) the endpoint is marked as down and the
+#   request is sent to the next one. Errors returned by the node are not
+#   retried. A failed eth_sendRawTransaction may have reached the node (e.g.
+#   on a timeout), so before re-sending it the next node is asked for the
+#   transaction by hash: if it is already known, its hash is returned.
+# - Filters live on the node that created them: the filter requests are
+#   sent to that node.
+#
+# ChainPools opens a pool for each network (e.g. source and target chain).
+#############################################################
+
+NEW_FILTER_METHODS = {'eth_newFilter', 'eth_newBlockFilter', 'eth_newPendingTransactionFilter'}
+FILTER_METHODS = {'eth_getFilterChanges', 'eth_getFilterLogs', 'eth_uninstallFilter'}
+
+
+# Function to create the provider of an endpoint (websocket or http URI)
+def make_provider(uri, timeout):
+    if uri.startswith('ws'):
+        return Web3.WebsocketProvider(uri, websocket_timeout=timeout)
+    return Web3.HTTPProvider(uri, request_kwargs={'timeout': timeout})
+
+
+class Endpoint:
+    def __init__(self, uri, connections, timeout, provider_factory=None):
+        self.uri = uri
+        self.connections = queue.Queue()
+        for _ in range(connections):
+            self.connections.put(provider_factory() if provider_factory is not None else make_provider(uri, timeout))
+        self.latency = None # EWMA of the probe latency (seconds)
+        self.block = None # last block number returned by the probe
+        self.healthy = False
+        self.failures = 0
+
+    def request(self, method, params):
+        provider = self.connections.get()
+        try:
+            return provider.make_request(method, params)
+        finally:
+            self.connections.put(provider)
+
+
+class ProviderPool(BaseProvider):
+    def __init__(self, endpoints, connections=2, timeout=10, probe_interval=5.0, alpha=0.3, max_block_lag=5, provider_factories=None):
+        super().__init__()
+        factories = provider_factories if provider_factories is not None else [None] * len(endpoints)
+        self.endpoints = [Endpoint(uri, connections, timeout, factory) for uri, factory in zip(endpoints, factories)]
+        self.probe_interval = probe_interval
+        self.alpha = alpha # weight of the last probe in the latency EWMA
+        self.max_block_lag = max_block_lag
+        self.lock = threading.Lock()
+        self.filters = dict() # filter id -> endpoint that created it
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def __str__(self):
+        return "Provider pool {}".format([endpoint.uri for endpoint in self.endpoints])
+
+    # Function to open the connections and start probing the endpoints
+    def start(self):
+        self.probe()
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def run(self):
+        while not self.stop_event.wait(self.probe_interval):
+            self.probe()
+
+    # Function to measure the latency and the last block of every endpoint
+    def probe(self):
+        for endpoint in self.endpoints:
+            start = time.perf_counter()
+            try:
+                block = endpoint.request('eth_blockNumber', [])['result']
+                block = block if isinstance(block, int) else int(block, 16)
+            except Exception as e:
+                self.mark_down(endpoint, e)
+                continue
+            latency = time.perf_counter() - start
+            with self.lock:
+                endpoint.latency = latency if endpoint.latency is None else self.alpha * latency + (1 - self.alpha) * endpoint.latency
+                endpoint.block = block
+                endpoint.failures = 0
+        with self.lock:
+            blocks = [endpoint.block for endpoint in self.endpoints if endpoint.block is not None and endpoint.failures == 0]
+            highest = max(blocks) if blocks else None
+            for endpoint in self.endpoints:
+                endpoint.healthy = (
+                    endpoint.failures == 0 and endpoint.block is not None
+                    and highest - endpoint.block <= self.max_block_lag
+                )
+
+    def mark_down(self, endpoint, error):
+        with self.lock:
+            if endpoint.healthy or endpoint.failures == 0:
+                print("Endpoint {} is down: {}".format(endpoint.uri, error))
+            endpoint.healthy = False
+            endpoint.failures += 1
+
+    # Function to get the endpoints in the order they are tried:
+    # healthy ones by latency, then the others (last resort)
+    def candidates(self):
+        with self.lock:
+            healthy = sorted((endpoint for endpoint in self.endpoints if endpoint.healthy), key=lambda endpoint: endpoint.latency)
+            others = sorted((endpoint for endpoint in self.endpoints if not endpoint.healthy), key=lambda endpoint: endpoint.failures)
+        return healthy + others
+
+    def make_request(self, method, params):
+        if method in FILTER_METHODS:
+            with self.lock:
+                endpoint = self.filters.get(params[0])
+            if endpoint is None:
+                raise ValueError("Unknown filter: {}".format(params[0]))
+            if method == 'eth_uninstallFilter':
+                with self.lock:
+                    self.filters.pop(params[0], None)
+            return endpoint.request(method, params)
+
+        errors = []
+        for endpoint in self.candidates():
+            try:
+                if method == 'eth_sendRawTransaction' and errors:
+                    # The transaction may have been propagated by the endpoint that failed
+                    tx_hash = Web3.to_hex(Web3.keccak(hexstr=params[0]))
+                    known = endpoint.request('eth_getTransactionByHash', [tx_hash])
+                    if known.get('result') is not None:
+                        return {'jsonrpc': '2.0', 'id': known.get('id'), 'result': tx_hash}
+                response = endpoint.request(method, params)
+            except Exception as e:
+                self.mark_down(endpoint, e)
+                errors.append('{}: {}'.format(endpoint.uri, e))
+                continue
+            if method in NEW_FILTER_METHODS and 'result' in response:
+                with self.lock:
+                    self.filters[response['result']] = endpoint
+            return response
+        raise ConnectionError("All the endpoints failed: {}".format('; '.join(errors)))
+
+    def is_connected(self, show_traceback=False):
+        with self.lock:
+            return any(endpoint.healthy for endpoint in self.endpoints)
+
+    # Function to get the state of the endpoints: uri -> (healthy, latency in ms, block)
+    def summary(self):
+        with self.lock:
+            return {
+                endpoint.uri: (endpoint.healthy, None if endpoint.latency is None else endpoint.latency * 1000, endpoint.block)
+                for endpoint in self.endpoints
+            }
+
+
+# Class holding a pool and a Web3 instance for each network
+class ChainPools:
+    def __init__(self, networks, poa=True, **pool_kwargs):
+        self.pools = dict()
+        self.web3 = dict()
+        for name, endpoints in networks.items():
+            pool = ProviderPool(endpoints, **pool_kwargs)
+            w3 = Web3(pool)
+            if poa:
+                # PoA networks (e.g. Besu with QBFT/Clique) need the middleware to read the blocks
+                w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+            self.pools[name] = pool
+            self.web3[name] = w3
+
+    def __getitem__(self, name):
+        return self.web3[name]
+
+    # Function to open the connections of all the networks
+    def start(self):
+        for pool in self.pools.values():
+            pool.start()
+        return self
+
+    def stop(self):
+        for pool in self.pools.values():
+            pool.stop()
@@ -0,0 +1,192 @@
+import threading
+from collections import OrderedDict
+import concurrent.futures
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.datastructures import AttributeDict
+from web3.exceptions import TimeExhausted, TransactionNotFound
+
+#############################################################
+# This class tracks the receipts of the transactions sent by the off-chain
+# component. Instead of polling the node for every transaction, a single
+# block filter is installed on the node: for each new block the tracker
+# checks which pending transactions it contains, fetches their receipts in
+# one go (eth_getBlockReceipts, when supported by the node) and resolves the
+# futures returned to the callers. The timestamps of the processed blocks
+# are cached to compute the validation time of the transactions.
+# The node is asked for a single receipt only for the transactions that may
+# have been mined before they were tracked: those recovered from the journal
+# at startup (recover) and the pending ones after a filter is reinstalled.
+#############################################################
+
+# JSON-RPC error code of a method not supported by the node
+METHOD_NOT_FOUND = -32601
+
+RECEIPT_QUANTITIES = ['blockNumber', 'cumulativeGasUsed', 'gasUsed', 'effectiveGasPrice', 'status', 'transactionIndex', 'type']
+RECEIPT_HASHES = ['blockHash', 'transactionHash', 'logsBloom']
+LOG_QUANTITIES = ['blockNumber', 'logIndex', 'transactionIndex']
+LOG_HASHES = ['blockHash', 'transactionHash', 'data']
+
+
+def _format_fields(raw, quantities, hashes):
+    formatted = dict(raw)
+    for field in quantities:
+        if isinstance(formatted.get(field), str):
+            formatted[field] = int(formatted[field], 16)
+    for field in hashes:
+        if formatted.get(field) is not None:
+            formatted[field] = HexBytes(formatted[field])
+    for field in ['from', 'to', 'contractAddress', 'address']:
+        if formatted.get(field) is not None:
+            formatted[field] = Web3.to_checksum_address(formatted[field])
+    return formatted
+
+
+# Function to convert a receipt returned by eth_getBlockReceipts to the
+# format of eth.get_transaction_receipt (integers, bytes and checksum addresses)
+def format_receipt(raw):
+    receipt = _format_fields(raw, RECEIPT_QUANTITIES, RECEIPT_HASHES)
+    logs = []
+    for log in raw.get('logs', []):
+        log = _format_fields(log, LOG_QUANTITIES, LOG_HASHES)
+        log['topics'] = [HexBytes(topic) for topic in log.get('topics', [])]
+        logs.append(log)
+    receipt['logs'] = logs
+    return AttributeDict.recursive(receipt)
+
+
+class ReceiptTracker(threading.Thread):
+    def __init__(self, w3, poll_interval=0.5, timestamp_cache_size=1024):
+        super().__init__(daemon=True)
+        self.w3 = w3
+        self.poll_interval = poll_interval # seconds between two polls of the block filter
+        self.timestamp_cache_size = timestamp_cache_size
+        self.lock = threading.Lock()
+        self.pending = dict() # tx hash -> future
+        self.timestamps = OrderedDict() # block number -> timestamp
+        self.listeners = [] # functions called with the number of each new block
+        self.block_receipts = True # False if the node does not support eth_getBlockReceipts
+        self.stop_event = threading.Event()
+        self.block_filter = w3.eth.filter('latest')
+
+    # Function to register a function called for each new block
+    def add_block_listener(self, listener):
+        self.listeners.append(listener)
+
+    # Function to start tracking a transaction, it returns a future resolved with the receipt.
+    # It should be called before sending the transaction (the hash is known after signing)
+    def track(self, tx_hash):
+        key = Web3.to_hex(tx_hash)
+        with self.lock:
+            if key not in self.pending:
+                self.pending[key] = concurrent.futures.Future()
+            return self.pending[key]
+
+    # Function to track a transaction sent before the tracker was started (e.g. recovered
+    # from the journal after a restart): its block may already be processed, so the node
+    # is queried once. It returns the receipt, or None if the transaction is not mined
+    def recover(self, tx_hash):
+        self.track(tx_hash)
+        receipt = self.lookup(tx_hash)
+        if receipt is not None:
+            self.resolve(Web3.to_hex(tx_hash), receipt)
+        return receipt
+
+    # Function to wait for the receipt of a transaction tracked before it was sent.
+    # If the receipt is not found in the processed blocks before the timeout, the node
+    # is queried directly
+    def wait(self, tx_hash, timeout=120):
+        future = self.track(tx_hash)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            try:
+                receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
+            except TimeExhausted:
+                with self.lock:
+                    self.pending.pop(Web3.to_hex(tx_hash), None)
+                raise
+            self.resolve(Web3.to_hex(tx_hash), receipt)
+            return receipt
+
+    # Function to read the receipt of a transaction from the node (None if not mined)
+    def lookup(self, tx_hash):
+        try:
+            return self.w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            return None
+
+    def resolve(self, key, receipt):
+        with self.lock:
+            future = self.pending.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(receipt)
+
+    # Function to get the timestamp of a block, read from the node only on a cache miss
+    def block_timestamp(self, block_number):
+        with self.lock:
+            if block_number in self.timestamps:
+                self.timestamps.move_to_end(block_number)
+                return self.timestamps[block_number]
+        timestamp = self.w3.eth.get_block(block_number).timestamp
+        self.cache_timestamp(block_number, timestamp)
+        return timestamp
+
+    def cache_timestamp(self, block_number, timestamp):
+        with self.lock:
+            self.timestamps[block_number] = timestamp
+            self.timestamps.move_to_end(block_number)
+            while len(self.timestamps) > self.timestamp_cache_size:
+                self.timestamps.popitem(last=False)
+
+    # Function to fetch the receipts of the pending transactions contained in a block
+    def fetch_receipts(self, block, matches):
+        if self.block_receipts:
+            try:
+                response = self.w3.provider.make_request('eth_getBlockReceipts', [hex(block.number)])
+            except Exception as e:
+                # Transient error: the receipts of this block are read one by one
+                print("eth_getBlockReceipts failed: ", e)
+                response = dict()
+            if response.get('result') is not None:
+                receipts = [format_receipt(receipt) for receipt in response['result']]
+                return {Web3.to_hex(receipt.transactionHash): receipt for receipt in receipts}
+            if response.get('error', {}).get('code') == METHOD_NOT_FOUND:
+                self.block_receipts = False
+        return {key: self.w3.eth.get_transaction_receipt(key) for key in matches}
+
+    # Function to process a new block
+    def process_block(self, block_hash):
+        block = self.w3.eth.get_block(block_hash)
+        self.cache_timestamp(block.number, block.timestamp)
+        with self.lock:
+            matches = [Web3.to_hex(tx) for tx in block.transactions if Web3.to_hex(tx) in self.pending]
+        if matches:
+            receipts = self.fetch_receipts(block, matches)
+            for key in matches:
+                if key in receipts:
+                    self.resolve(key, receipts[key])
+        for listener in self.listeners:
+            listener(block.number)
+
+    def run(self):
+        while not self.stop_event.wait(self.poll_interval):
+            try:
+                for block_hash in self.block_filter.get_new_entries():
+                    self.process_block(block_hash)
+            except Exception as e:
+                # The filter can be dropped by the node, install a new one
+                print("Receipt tracker error: ", e)
+                try:
+                    self.block_filter = self.w3.eth.filter('latest')
+                    # The blocks mined without a filter are not notified
+                    with self.lock:
+                        pending = list(self.pending.keys())
+                    for key in pending:
+                        self.recover(key)
+                except Exception as e:
+                    print("Receipt tracker error: ", e)
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
@@ -0,0 +1,169 @@
+import queue
+import sqlite3
+import threading
+import time
+
+#############################################################
+# This file contains the checkpoint journal of the off-chain component.
+# The journal is an append-only SQLite table recording the state of each
+# inter-chain request (signed, submitted, confirmed) and the last block
+# ingested on each chain. Writes are queued and committed in groups by a
+# background thread, so the signing path never waits on disk. A submitted request stores the signed transaction and is
+# flushed before the transaction is sent: after a restart the relay waits
+# for it (or broadcasts it again) instead of signing the request twice.
+# At startup the journal is replayed in memory: the event ingestion resumes
+# from the block after the checkpoint of its chain and the relay skips the
+# requests already confirmed.
+#############################################################
+
+SIGNED = 'signed'
+SUBMITTED = 'submitted'
+CONFIRMED = 'confirmed'
+
+# Order of the states, a request never goes back to a previous state
+STATES = {SIGNED: 0, SUBMITTED: 1, CONFIRMED: 2}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    chain TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    sender TEXT,
+    nonce INTEGER,
+    state TEXT,
+    block INTEGER,
+    tx_hash TEXT,
+    raw_tx TEXT,
+    timestamp REAL NOT NULL
+)
+"""
+
+
+# Class implementing the append-only journal with group commit
+class RelayJournal:
+    def __init__(self, path, commit_interval=0.05, commit_size=256):
+        self.path = path
+        self.commit_interval = commit_interval # max seconds a write waits before being committed
+        self.commit_size = commit_size # max number of writes in a single commit
+        self.lock = threading.Lock()
+        self.blocks = dict() # chain -> last ingested block
+        self.requests = dict() # (chain, sender, nonce) -> (state, tx_hash, raw_tx)
+        self.pending = queue.Queue()
+        self.flushed = threading.Condition()
+        self.written = 0
+        self.committed = 0
+
+        connection = sqlite3.connect(path)
+        connection.execute(SCHEMA)
+        connection.commit()
+        self.replay(connection)
+        connection.close()
+
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    # Function to load the state recorded in the journal
+    def replay(self, connection):
+        rows = connection.execute('SELECT chain, kind, sender, nonce, state, block, tx_hash, raw_tx FROM journal ORDER BY seq')
+        for chain, kind, sender, nonce, state, block, tx_hash, raw_tx in rows:
+            if kind == 'block':
+                self._apply_block(chain, block)
+            else:
+                self._apply_request(chain, sender, nonce, state, tx_hash, raw_tx)
+
+    def _apply_block(self, chain, block):
+        if block > self.blocks.get(chain, -1):
+            self.blocks[chain] = block
+            return True
+        return False
+
+    def _apply_request(self, chain, sender, nonce, state, tx_hash, raw_tx):
+        key = (chain, sender, nonce)
+        current = self.requests.get(key)
+        if current is not None:
+            # A request signed again after a restart is submitted with a new transaction
+            resubmitted = state == SUBMITTED == current[0] and tx_hash not in (None, current[1])
+            if STATES[current[0]] >= STATES[state] and not resubmitted:
+                return False
+        if tx_hash is None and current is not None:
+            tx_hash, raw_tx = current[1], current[2]
+        self.requests[key] = (state, tx_hash, raw_tx)
+        return True
+
+    # Function to record the last block ingested on a chain
+    def record_block(self, chain, block):
+        with self.lock:
+            if not self._apply_block(chain, block):
+                return
+            self.written += 1
+        self.pending.put((chain, 'block', None, None, None, block, None, None, time.time()))
+
+    # Function to record the new state of an inter-chain request. The submitted state
+    # carries the hash and the raw signed transaction (hex), with sync=True the call
+    # returns when the record is on disk (e.g. before sending the transaction)
+    def record_request(self, chain, sender, nonce, state, tx_hash=None, raw_tx=None, sync=False):
+        with self.lock:
+            if not self._apply_request(chain, sender, nonce, state, tx_hash, raw_tx):
+                return
+            self.written += 1
+        self.pending.put((chain, 'request', sender, nonce, state, None, tx_hash, raw_tx, time.time()))
+        if sync:
+            self.flush()
+
+    # Function to get the last block ingested on a chain (None if never recorded)
+    def last_block(self, chain):
+        with self.lock:
+            return self.blocks.get(chain)
+
+    # Function to get the state, the transaction hash and the raw transaction of a request (None if unknown)
+    def request_state(self, chain, sender, nonce):
+        with self.lock:
+            return self.requests.get((chain, sender, nonce))
+
+    # Function to get the requests in a given state, e.g. the submitted
+    # requests whose receipt must be checked after a restart
+    def requests_in_state(self, state):
+        with self.lock:
+            return [(key, value[1]) for key, value in self.requests.items() if value[0] == state]
+
+    def _write_loop(self):
+        connection = sqlite3.connect(self.path)
+        while True:
+            group = [self.pending.get()]
+            deadline = time.monotonic() + self.commit_interval
+            while len(group) < self.commit_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    group.append(self.pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            closing = None in group
+            rows = [row for row in group if row is not None]
+            if rows:
+                connection.executemany(
+                    'INSERT INTO journal (chain, kind, sender, nonce, state, block, tx_hash, raw_tx, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    rows
+                )
+                connection.commit()
+            with self.flushed:
+                self.committed += len(rows)
+                self.flushed.notify_all()
+            if closing:
+                connection.close()
+                return
+
+    # Function to wait until all the recorded writes are on disk
+    def flush(self):
+        with self.lock:
+            target = self.written
+        with self.flushed:
+            while self.committed < target:
+                self.flushed.wait()
+
+    # Function to commit the pending writes and stop the writer thread
+    def close(self):
+        self.flush()
+        self.pending.put(None)
+        self.writer.join()
@@ -0,0 +1,380 @@
+import sys
+import argparse
+import queue
+import random
+import secrets
+import threading
+import time
+import concurrent.futures
+from web3 import Web3
+from eth_account import Account
+from curves import CURVES
+from threshold_core import key_gen, partial_ecdsa_sign, combine_partial_signatures
+from local_evm import local_web3, deploy
+from event_ingestion import EventIngestor, SOURCE_EVENTS, TARGET_EVENTS
+from receipt_tracker import ReceiptTracker
+from latency_metrics import LatencyRecorder
+from signer_selection import RandomSelection
+from packed_encoding import inter_chain_preimage, message_hash, pack_signature
+from gas_oracle import GasOracle
+from signature_batcher import SignatureBatcher, InterChainSignature, batch_submitter, batch_confirmer
+
+################################################################################
+# FILE DESCRIPTION:
+# This file contains an end-to-end simulation of the inter-chain relay on the
+# in-process EVM of local_evm.py. DataStorage, SourceSmartContract,
+# TargetSmartContract and VerifyThresholdECDSA are deployed (both chains are
+# simulated by the same EVM) and each inter-chain transaction goes through
+# the whole flow:
+#   1. a user calls interChainTransactionSyncDataStart on the source contract;
+#   2. the off-chain component reads the event, t of the n nodes sign it and
+#      verifyECDSAForInterChainSyncDataExecutionRecover executes it on the
+#      target contract;
+#   3. the off-chain component reads the execution event, signs it again and
+#      verifyECDSAForInterChainSyncDataEndRecover ends it on the source
+#      contract (completion ack: eventInterChainTransactionSyncDataEnd).
+# With --packed the *Packed entry points are used instead.
+#
+# The load generator is open-loop: the requests arrive as a Poisson process
+# with the given rate, whether or not the previous ones have completed. Each
+# user has at most one pending inter-chain transaction (userLock), the time
+# waiting for a free user is part of the latency.
+# The report contains the sustained throughput and the end-to-end latency
+# percentiles; the timing of each phase is written with LatencyRecorder.
+#
+# NOTICE: the curve is fixed at compile time by the import in
+# EllipticCurveMaths.sol, --curve must match the compiled artifacts.
+#
+# Usage:
+#   python relay_simulator.py --rate 5 --duration 60 --nodes 10 --threshold 7
+################################################################################
+
+SERVICE = 'SYNC_DATA'
+END_EVENTS = ['eventInterChainTransactionSyncDataEnd']
+GAS_LIMIT = 3000000
+
+
+# Function to compute the percentile p of a sorted list
+def percentile(ordered, p):
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+# Class signing and sending the transactions of an account.
+# The nonce is assigned and the transaction is sent under a lock, so several threads can use it
+class TransactionSender:
+    def __init__(self, w3, account, tracker, gas_price):
+        self.w3 = w3
+        self.account = account
+        self.tracker = tracker
+        self.gas_price = gas_price
+        self.chain_id = w3.eth.chain_id
+        self.nonce = w3.eth.get_transaction_count(account.address)
+        self.lock = threading.Lock()
+
+    # Function to send a contract function call, it returns the receipt
+    def send(self, contract_function):
+        with self.lock:
+            raw_transaction = contract_function.build_transaction({
+                'from': self.account.address,
+                'nonce': self.nonce,
+                'gas': GAS_LIMIT,
+                'gasPrice': self.gas_price,
+                'chainId': self.chain_id
+            })
+            signed_tx = self.account.sign_transaction(raw_transaction)
+            self.nonce += 1
+            self.tracker.track(signed_tx.hash)
+            self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+        return self.tracker.wait(signed_tx.hash)
+
+
+class RelaySimulator:
+    def __init__(self, curve, num_nodes, threshold, rate, duration, users=64, workers=4, poll_interval=0.05, seed=None, phases_path=None, batch=0, batch_delay=0.5, packed=False):
+        self.curve = curve
+        self.num_nodes = num_nodes
+        self.threshold = threshold
+        self.rate = rate # requests per second
+        self.duration = duration # seconds of load
+        self.workers = workers # threads signing and submitting the verifications
+        self.poll_interval = poll_interval
+        self.packed = packed # submit the signatures through the *Packed entry points
+        self.rng = random.Random(seed)
+        self.metrics = LatencyRecorder(phases_path, window=100000)
+        self.selection = RandomSelection()
+
+        self.w3 = local_web3()
+        self.gas_price = self.w3.eth.gas_price
+        self.deploy_contracts()
+
+        self.tracker = ReceiptTracker(self.w3, poll_interval=poll_interval)
+        self.relayer = TransactionSender(self.w3, self.fund(Account.create()), self.tracker, self.gas_price)
+        self.users = queue.Queue()
+        for _ in range(users):
+            self.users.put(TransactionSender(self.w3, self.fund(Account.create()), self.tracker, self.gas_price))
+
+        # Optional batching of the verifications: one batcher (and one account) for each stage,
+        # each signature is completed with its own result read from the events of the batch
+        self.batchers = dict()
+        if batch > 0:
+            gas_oracle = GasOracle(self.w3)
+            functions = {'execution': 'verifyECDSAForInterChainSyncDataExecutionBatch', 'end': 'verifyECDSAForInterChainSyncDataEndBatch'}
+            for stage, function_name in functions.items():
+                account = self.fund(Account.create())
+                submit = batch_submitter(self.w3, self.verify, account, account.key, function_name, gas_oracle, self.tracker)
+                self.batchers[stage] = SignatureBatcher(submit, max_batch=batch, max_delay=batch_delay, confirm=batch_confirmer(self.verify, self.tracker))
+
+        self.lock = threading.Lock()
+        self.inflight = dict() # (sender, nonce) -> (arrival time, user)
+        self.user_nonces = dict() # sender -> last nonce
+        self.latencies = [] # end-to-end latencies (milliseconds)
+        self.failures = 0
+        self.locked_users = 0 # users left locked on the source contract by a failed transaction
+        self.arrivals = 0
+        self.first_arrival = None
+        self.last_completion = None
+        self.drained = threading.Condition(self.lock)
+
+    def deploy_contracts(self):
+        w3 = self.w3
+        data_storage = deploy(w3, 'DataStorage')
+        self.source = deploy(w3, 'SourceSmartContract', data_storage.address)
+        self.target = deploy(w3, 'TargetSmartContract', data_storage.address)
+        self.verify = deploy(w3, 'VerifyThresholdECDSA', self.source.address, self.target.address)
+        self.source.functions.setVerifierSC(self.verify.address).transact()
+        self.target.functions.setVerifierSC(self.verify.address).transact()
+
+        # Generate the threshold key and store the global public key on the verify contract
+        secret = secrets.randbelow(self.curve.n)
+        self.shares, _ = key_gen(secret, self.num_nodes, self.threshold, self.curve)
+        global_pk = self.curve.multiply_point(secret, self.curve.G)
+        self.verify.functions.updatePublicKey(global_pk.x, global_pk.y).transact()
+
+    def fund(self, account):
+        self.w3.eth.send_transaction({'to': account.address, 'value': Web3.to_wei(100, 'ether')})
+        return account
+
+    # Function to produce the threshold signature of an inter-chain transaction
+    def threshold_sign(self, preimage):
+        hash = message_hash(preimage)
+        ids_signers = sorted(self.selection.select(range(1, self.num_nodes + 1), self.threshold))
+        k = sum(secrets.randbelow(self.curve.n) for _ in ids_signers) % self.curve.n
+        partial_signatures = [(index, partial_ecdsa_sign(self.shares[index-1][1], hash, k, self.curve)) for index in ids_signers]
+        return combine_partial_signatures(partial_signatures, ids_signers, self.curve)
+
+    # Function to relay an event: sign it and submit the verification
+    def relay(self, request):
+        stage = 'execution' if request.event in SOURCE_EVENTS else 'end'
+        key = (request.sender, request.nonce)
+        try:
+            # The value is read from the message of the event (start and execution events carry it)
+            with self.metrics.span(stage + '_signing'):
+                preimage = inter_chain_preimage(request.nonce, request.sender, request.value)
+                sign = self.threshold_sign(preimage)
+            if self.batchers:
+                with self.metrics.span(stage + '_submission'):
+                    _, _, valid = self.batchers[stage].add(InterChainSignature(request.nonce, request.sender, request.value, *sign)).result()
+                if not valid:
+                    raise RuntimeError("signature rejected in the batch")
+                return
+            if self.packed:
+                data = pack_signature(preimage, sign)
+                if stage == 'execution':
+                    verify_function = self.verify.functions.verifyECDSAForInterChainSyncDataExecutionPacked(data)
+                else:
+                    verify_function = self.verify.functions.verifyECDSAForInterChainSyncDataEndPacked(data)
+            elif stage == 'execution':
+                verify_function = self.verify.functions.verifyECDSAForInterChainSyncDataExecutionRecover(request.nonce, request.sender, request.value, *sign)
+            else:
+                verify_function = self.verify.functions.verifyECDSAForInterChainSyncDataEndRecover(request.nonce, request.sender, request.value, *sign)
+            with self.metrics.span(stage + '_submission'):
+                receipt = self.relayer.send(verify_function)
+            if receipt.status != 1:
+                raise RuntimeError("verification reverted: {}".format(receipt.transactionHash.hex()))
+        except Exception as e:
+            print("Relay error ({} {}): {}".format(stage, key, e))
+            self.complete(key, failed=True)
+
+    # Function to start an inter-chain transaction for a request arrived at arrival_ns
+    def start_request(self, arrival_ns, user_timeout=60):
+        try:
+            user = self.users.get(timeout=user_timeout)
+        except queue.Empty:
+            with self.lock:
+                self.failures += 1
+                locked_users = self.locked_users
+            print("No free user: {} users are locked by failed inter-chain transactions".format(locked_users))
+            return
+        self.metrics.record('user_wait', arrival_ns, time.perf_counter_ns() - arrival_ns)
+        address = user.account.address
+        value = self.rng.randrange(1, 2**64)
+        with self.lock:
+            nonce = self.user_nonces.get(address, 0) + 1
+            self.user_nonces[address] = nonce
+            self.inflight[(address, nonce)] = (arrival_ns, user)
+        try:
+            with self.metrics.span('start_submission'):
+                receipt = user.send(self.source.functions.interChainTransactionSyncDataStart(nonce, SERVICE, value))
+        except Exception as e:
+            # The start transaction may still be mined and lock the user
+            print("Start error ({}): {}".format(address, e))
+            self.complete((address, nonce), failed=True)
+            return
+        if receipt.status != 1:
+            # The reverted start has not taken the lock: the user can be used again
+            print("Start reverted ({}): {}".format(address, receipt.transactionHash.hex()))
+            self.complete((address, nonce), failed=True, released=True)
+
+    # Function to record the end of an inter-chain transaction and release its user.
+    # A failed transaction releases its user only if the start did not take the lock (released)
+    def complete(self, key, failed=False, released=False):
+        now = time.perf_counter_ns()
+        with self.lock:
+            entry = self.inflight.pop(key, None)
+            if entry is None:
+                return
+            arrival_ns, user = entry
+            if failed:
+                self.failures += 1
+                if released:
+                    # The nonce of the user on the source contract has not been incremented
+                    if self.user_nonces.get(key[0]) == key[1]:
+                        self.user_nonces[key[0]] = key[1] - 1
+                    self.users.put(user)
+                else:
+                    # The lock of the user on the source contract is not released
+                    self.locked_users += 1
+            else:
+                self.latencies.append((now - arrival_ns) / 1e6)
+                self.last_completion = now
+                self.users.put(user)
+            self.drained.notify_all()
+        if not failed:
+            self.metrics.record('end_to_end', arrival_ns, now - arrival_ns)
+
+    # Thread dispatching the events read from the contracts to the relay workers
+    def dispatch(self, requests, executor, stop_event):
+        while not stop_event.is_set():
+            try:
+                request = requests.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+            executor.submit(self.relay, request)
+
+    # Thread reading the completion acks
+    def acknowledge(self, acks, stop_event):
+        while not stop_event.is_set():
+            try:
+                ack = acks.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+            self.complete((ack.sender, ack.nonce))
+
+    def run(self, drain_timeout=120):
+        from_block = self.w3.eth.block_number + 1
+        requests = queue.Queue()
+        acks = queue.Queue()
+        ingestors = [
+            EventIngestor(self.w3, self.source, SOURCE_EVENTS, from_block=from_block, poll_interval=self.poll_interval, output=requests),
+            EventIngestor(self.w3, self.target, TARGET_EVENTS, from_block=from_block, poll_interval=self.poll_interval, output=requests),
+            EventIngestor(self.w3, self.source, END_EVENTS, from_block=from_block, poll_interval=self.poll_interval, output=acks),
+        ]
+        stop_event = threading.Event()
+        relay_executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+        # Arrivals are never blocked by the previous requests (open loop)
+        clients = concurrent.futures.ThreadPoolExecutor(max_workers=self.users.qsize())
+        threads = [
+            threading.Thread(target=self.dispatch, args=(requests, relay_executor, stop_event), daemon=True),
+            threading.Thread(target=self.acknowledge, args=(acks, stop_event), daemon=True),
+        ]
+        self.tracker.start()
+        for thread in ingestors + threads + list(self.batchers.values()):
+            thread.start()
+
+        start = time.perf_counter_ns()
+        self.first_arrival = start
+        next_arrival = 0.0
+        while True:
+            next_arrival += self.rng.expovariate(self.rate)
+            if next_arrival >= self.duration:
+                break
+            delay = start + next_arrival * 1e9 - time.perf_counter_ns()
+            if delay > 0:
+                time.sleep(delay / 1e9)
+            with self.lock:
+                self.arrivals += 1
+            clients.submit(self.start_request, time.perf_counter_ns())
+
+        # Wait for the pending inter-chain transactions
+        clients.shutdown(wait=True)
+        with self.drained:
+            self.drained.wait_for(lambda: not self.inflight, timeout=drain_timeout)
+            pending = len(self.inflight)
+
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+        relay_executor.shutdown(wait=True)
+        for batcher in self.batchers.values():
+            batcher.stop()
+        for ingestor in ingestors:
+            ingestor.stop()
+        self.tracker.stop()
+        self.metrics.close()
+        return self.report(pending)
+
+    def report(self, pending):
+        ordered = sorted(self.latencies)
+        completed = len(ordered)
+        elapsed = (self.last_completion - self.first_arrival) / 1e9 if completed else None
+        return {
+            'offered_rate': self.rate,
+            'arrivals': self.arrivals,
+            'completed': completed,
+            'failed': self.failures,
+            'pending': pending,
+            'locked_users': self.locked_users,
+            'throughput': completed / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(ordered, 50),
+            'p90_ms': percentile(ordered, 90),
+            'p99_ms': percentile(ordered, 99),
+            'max_ms': ordered[-1] if ordered else None
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="End-to-end simulation of the threshold relay on an in-process EVM")
+    parser.add_argument('--curve', default='secp256k1', choices=list(CURVES.keys()), help="curve imported by EllipticCurveMaths.sol")
+    parser.add_argument('--nodes', type=int, default=10, help="number of nodes n")
+    parser.add_argument('--threshold', type=int, default=7, help="threshold t")
+    parser.add_argument('--rate', type=float, default=5.0, help="arrival rate (inter-chain transactions per second)")
+    parser.add_argument('--duration', type=float, default=60.0, help="seconds of load")
+    parser.add_argument('--users', type=int, default=64, help="number of users sending inter-chain transactions")
+    parser.add_argument('--workers', type=int, default=4, help="threads signing and submitting the verifications")
+    parser.add_argument('--seed', type=int, help="seed of the arrivals and of the values")
+    parser.add_argument('--phases', help="path of the csv file with the timing of each phase")
+    parser.add_argument('--batch', type=int, default=0, help="max signatures in a batch verification (0 to verify them one by one), the workers wait for their batch so use at least as many workers")
+    parser.add_argument('--batch-delay', type=float, default=0.5, help="max seconds a signature waits for its batch")
+    parser.add_argument('--packed', action='store_true', help="submit the signatures through the *Packed entry points")
+    args = parser.parse_args()
+
+    simulator = RelaySimulator(
+        CURVES[args.curve], args.nodes, args.threshold, args.rate, args.duration,
+        users=args.users, workers=args.workers, seed=args.seed, phases_path=args.phases,
+        batch=args.batch, batch_delay=args.batch_delay, packed=args.packed
+    )
+    report = simulator.run()
+
+    simulator.metrics.print_summary()
+    print("Offered rate: {:.2f} tx/s, arrivals: {}, completed: {}, failed: {}, pending: {}".format(
+        report['offered_rate'], report['arrivals'], report['completed'], report['failed'], report['pending']))
+    print("Sustained throughput: {:.2f} tx/s".format(report['throughput']))
+    if report['completed']:
+        print("End-to-end latency: p50={:.1f}ms p90={:.1f}ms p99={:.1f}ms max={:.1f}ms".format(
+            report['p50_ms'], report['p90_ms'], report['p99_ms'], report['max_ms']))
+    if report['locked_users']:
+        print("Users left locked by failed inter-chain transactions: {} of {}".format(report['locked_users'], args.users))
+    if report['failed'] or report['pending']:
+        sys.exit(1)
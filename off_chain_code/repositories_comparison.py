@@ -1,5 +1,6 @@
 import sys
 sys.path.insert(1, '../threshold-signature/src/python_threshold')
+import argparse
 import os
 import json
 import traceback
@@ -9,7 +10,11 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from web3 import Web3
 from web3.middleware import geth_poa_middleware
+from web3.exceptions import ContractLogicError
 from elliptic_curve_operations import EllipticCurve, Point, ecdsa_sign, ecdsa_verify
+from threshold_ecdsa_utils import partial_ecdsa_sign
+from packed_encoding import verify_ecdsa_preimage, message_hash, pack_signature
+from curves import secp256k1
 import config
 
 ################################################################################
@@ -17,40 +22,112 @@ import config
 # This file contains functions to compare the elliptic curve implementations found
 # on Github against the proposed implementation.
 # The comparison are conducted on a private Hyperledger Besu blockchain.
+#
+# Two measurement modes are available:
+# - 'besu': every operation is sent as a real transaction to the Besu network
+#   and the gas is read from the mined receipt.
+# - 'local' (--local): CompareECC is deployed on an in-process EVM (eth-tester/py-evm)
+#   and the gas is read with eth_estimateGas. No outside service is needed.
+# Both modes produce the same columns in the output csv file and read the
+# compiled contracts from config.build_path.
+# The calldata encodings of the verification are measured on a VerifyThresholdECDSA
+# deployed by this script with a benchmark key (also on Besu): the key of the
+# deployed relay contract is never changed.
+#
+# Usage:
+#   python repositories_comparison.py
+#   python repositories_comparison.py --local
 ################################################################################
 
-# Load the besu configuration from the file config.py
-ws_besu = config.ws_besu
-# Load the private key used to send transactions from config.py
-private_key_besu = config.besu_pk
-
-# Instantiate a Web3 calss to interact with the blockchain
-w3 = Web3(Web3.WebsocketProvider(ws_besu[0]))
-# Inject the middleware_onion
-w3.middleware_onion.inject(geth_poa_middleware, layer=0)
-# load the account using the private key
-account = w3.eth.account.from_key(private_key_besu)
-
-# Load the json of the compiled contract CompareECC.sol and its address within the blockchain
-path_compiled_compare_ecc = os.path.abspath('../threshold-signature/build/contracts/CompareECC.json')
-path_address = os.path.abspath('../threshold-signature/contractAddresses/besu/addresses.json')
-
-# load contract abi and bytecode
-compare_contract = dict()
-with open(path_compiled_compare_ecc, 'r') as json_file:
-    compiled_contract = json.load(json_file)
-    compare_contract['abi'] = compiled_contract['abi']
-    compare_contract['bytecode'] = compiled_contract['bytecode']
-
-# load verify_contract address
-with open(path_address, 'r') as json_file:
-    address_data = json.load(json_file)
-    compare_contract['address'] = address_data['CompareECC']
-
-# Load the contract from the blockchain
-compare_contract = w3.eth.contract(abi=compare_contract['abi'], address=compare_contract['address'])
+parser = argparse.ArgumentParser(description="Gas comparison of the elliptic curve libraries")
+parser.add_argument('--local', action='store_true', help="measure on an in-process EVM instead of the Besu network")
+# Measurement mode: 'besu' or 'local'
+MODE = 'local' if parser.parse_args().local else 'besu'
+# Number of measurements for each operation and library
+NUM_TESTS = 250
+
+if MODE == 'besu':
+    # Load the besu configuration from the file config.py
+    ws_besu = config.ws_besu_1
+    # Load the private key used to send transactions from config.py
+    private_key_besu = config.besu_1_sk
+
+    # Instantiate a Web3 calss to interact with the blockchain
+    w3 = Web3(Web3.WebsocketProvider(ws_besu[0]))
+    # Inject the middleware_onion
+    w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+    # load the account using the private key
+    account = w3.eth.account.from_key(private_key_besu)
+    sender = account.address
+
+    # Load the json of the compiled contract CompareECC.sol and its address within the blockchain
+    path_compiled_compare_ecc = os.path.join(os.path.abspath(config.build_path), 'CompareECC.json')
+    path_address = os.path.abspath('../threshold-signature/contractAddresses/besu/addresses.json')
+
+    # load contract abi and bytecode
+    compare_contract = dict()
+    with open(path_compiled_compare_ecc, 'r') as json_file:
+        compiled_contract = json.load(json_file)
+        compare_contract['abi'] = compiled_contract['abi']
+        compare_contract['bytecode'] = compiled_contract['bytecode']
+
+    # load verify_contract address
+    with open(path_address, 'r') as json_file:
+        address_data = json.load(json_file)
+        compare_contract['address'] = address_data['CompareECC']
+
+    # Load the contract from the blockchain
+    compare_contract = w3.eth.contract(abi=compare_contract['abi'], address=compare_contract['address'])
+
+    # Deploy a dedicated VerifyThresholdECDSA (compiled with secp256k1.sol), used to compare the
+    # calldata encodings: its public key is replaced with the benchmark key
+    from local_evm import deploy
+    verify_contract = deploy(w3, 'VerifyThresholdECDSA', sender, sender, private_key=private_key_besu)
+else:
+    from local_evm import local_web3, deploy
+
+    # Instantiate a Web3 class connected to the in-process EVM and deploy CompareECC
+    w3 = local_web3()
+    sender = w3.eth.default_account
+    compare_contract = deploy(w3, 'CompareECC')
+    verify_contract = deploy(w3, 'VerifyThresholdECDSA', sender, sender)
+
 compare_contract.address
 
+
+# Function to send a transaction to a contract, it returns the receipt
+def send_transaction(contract_function):
+    if MODE == 'local':
+        return w3.eth.wait_for_transaction_receipt(contract_function.transact({'from': sender}))
+
+    raw_tx = contract_function.build_transaction({
+        'from':  sender,
+        'nonce': w3.eth.get_transaction_count(sender),
+        "gasPrice": 0
+        # Additional fields like 'gas', 'value', etc., can be specified if necessary
+    })
+
+    signed_txn = w3.eth.account.sign_transaction(raw_tx, private_key=private_key_besu)
+    txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
+    return w3.eth.wait_for_transaction_receipt(txn_hash)
+
+
+# Function to get the gas consumed by a call to a contract (excluding the 21000 base cost).
+# A reverted call is not a measurement: it returns None (an empty cell in the csv file)
+def gas_used(contract_function):
+    try:
+        if MODE == 'local':
+            return contract_function.estimate_gas({'from': sender}) - 21000
+        receipt = send_transaction(contract_function)
+    except ContractLogicError as e:
+        print("Reverted {}: {}".format(contract_function.fn_name, e))
+        return None
+    if receipt.status != 1:
+        print("Reverted {}: {}".format(contract_function.fn_name, receipt.transactionHash.hex()))
+        return None
+    return receipt.gasUsed - 21000
+
+
 ###############################################################################
 # Be carefull, only our implementation and the implementation from Witenet Foundation
 # allow the application of generic elliptic curve
@@ -71,8 +148,8 @@ curve = EllipticCurve(
     h = 1
 )
 
-# BRAINPOOLP256r1 sk
-sk = "PUT HERE A VALID PRIVATE KEY"
+# BRAINPOOLP256r1 sk (put here a valid private key, a random one is used otherwise)
+sk = secrets.randbelow(curve.n)
 # Compute the public key from the private key
 pk = curve.multiply_point(sk, curve.G)
 
@@ -86,79 +163,71 @@ pk = curve.multiply_point(sk, curve.G)
 # https://github.com/pmerkleplant/crysol/blob/main/src/secp256k1/Secp256k1Arithmetic.sol
 # https://github.com/pmerkleplant/crysol/blob/main/src/secp256k1/Secp256k1Arithmetic.sol
 
+transactions_data = []
+
+#########################################################################################
+# GENERATE THE INPUTS
+# All the inputs are generated in bulk before starting the measurements
+#########################################################################################
+inverse_inputs = [secrets.randbelow(curve.p) for i in range(NUM_TESTS)]
+
+double_inputs = []
+P = curve.add_points(curve.G, curve.G)
+for i in range(NUM_TESTS):
+    # Generate a random point on the curve
+    P = curve.add_points(P, curve.G)
+    double_inputs.append(P)
+
+add_inputs = []
+P1 = curve.add_points(curve.G, curve.G)
+for i in range(NUM_TESTS):
+    P1 = curve.add_points(P1, curve.G)
+    P2 = curve.add_points(P1, pk)
+    add_inputs.append((P1, P2))
+
+scalar_inputs = [secrets.randbelow(sk) for i in range(NUM_TESTS)]
+
+strauss_inputs = [(secrets.randbelow(sk), secrets.randbelow(sk)) for i in range(NUM_TESTS)]
+
+# Messages of verifyECDSA signed with a secp256k1 key (the curve of VerifyThresholdECDSA):
+# the packed preimage is hashed for the signature and reused as calldata
+verify_sk = secrets.randbelow(secp256k1.n)
+verify_pk = secp256k1.multiply_point(verify_sk, secp256k1.G)
+verify_inputs = []
+for i in range(NUM_TESTS):
+    val1 = secrets.randbelow(secp256k1.n)
+    val2 = secrets.randbelow(secp256k1.n)
+    val3 = secrets.token_hex(5)
+    preimage = verify_ecdsa_preimage(10000, val1, val2, val3, sender)
+    k = secrets.randbelow(secp256k1.n)
+    verify_inputs.append((val1, val2, val3, preimage, partial_ecdsa_sign(verify_sk, message_hash(preimage), k, secp256k1)))
+
 
 #########################################################################################
 # INVERSE MODULE
 # Test the gans consumption of the inverse module operation
 #########################################################################################
-for i in range(250):
-    ski = secrets.randbelow(curve.p)
-    raw_tx = compare_contract.functions.checkInverseBase(ski).build_transaction({
-        'from':  account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        "gasPrice": 0
-        # Additional fields like 'gas', 'value', etc., can be specified if necessary
-    })
-
-    signed_txn = w3.eth.account.sign_transaction(raw_tx, private_key=private_key_besu)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-    receipt = w3.eth.wait_for_transaction_receipt(txn_hash)
-    receipt
-    receipt.gasUsed - 21000
+for ski in inverse_inputs:
     transactions_data.append({
-        'Repo1InvMod': receipt.gasUsed - 21000
+        'Repo1InvMod': gas_used(compare_contract.functions.checkInverseBase(ski))
     })
 
     # STATS ON Repo2 only (SECP256R1)
     # Mod Inverse
-    raw_tx = compare_contract.functions.checkInverseFCC(ski).build_transaction({
-        'from':  account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        "gasPrice": 0
-    })
-    signed_txn = w3.eth.account.sign_transaction(raw_tx, private_key=private_key_besu)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-    receipt = w3.eth.wait_for_transaction_receipt(txn_hash)
-    receipt
-    receipt.gasUsed - 21000
     transactions_data.append({
-        'Repo2InvMod': receipt.gasUsed - 21000
+        'Repo2InvMod': gas_used(compare_contract.functions.checkInverseFCC(ski))
     })
 
     # Stats on Repo3 only (SECP256K1)
     # Mod Inverse
-    raw_tx = compare_contract.functions.checkInverseSecp256k1(ski).build_transaction({
-        'from':  account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        "gasPrice": 0
-        # Additional fields like 'gas', 'value', etc., can be specified if necessary
-    })
-
-    signed_txn = w3.eth.account.sign_transaction(raw_tx, private_key=private_key_besu)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-    receipt = w3.eth.wait_for_transaction_receipt(txn_hash)
-    receipt
-    receipt.gasUsed - 21000
     transactions_data.append({
-        'Repo3InvMod': receipt.gasUsed - 21000
+        'Repo3InvMod': gas_used(compare_contract.functions.checkInverseSecp256k1(ski))
     })
 
     # STATS on proposal
     # Mod Inverse
-    raw_tx = compare_contract.functions.checkInverseOpt(ski).build_transaction({
-        'from':  account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        "gasPrice": 0
-        # Additional fields like 'gas', 'value', etc., can be specified if necessary
-    })
-
-    signed_txn = w3.eth.account.sign_transaction(raw_tx, private_key=private_key_besu)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-    receipt = w3.eth.wait_for_transaction_receipt(txn_hash)
-    receipt
-    receipt.gasUsed - 21000
     transactions_data.append({
-        'ProposedInvMod': receipt.gasUsed - 21000
+        'ProposedInvMod': gas_used(compare_contract.functions.checkInverseOpt(ski))
     })
 
 ############################################################################################
@@ -170,65 +239,23 @@ for i in range(250):
 # START JACOBIAN DOUBLE
 # Test the gas consumption of the double point operation in Jacobian Coordinates
 ############################################################################################
-P = curve.add_points(curve.G, curve.G)
-for i in range(250):
-    # Generate a random point on the curve
-    P = curve.add_points(P, curve.G)
-
-    # prepare a raw transaction directed to the s.c.
-    raw_tx = compare_contract.functions.checkJacobianDoubleNormal(P.x, P.y).build_transaction({
-        'from':  account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        "gasPrice": 0
-        # Additional fields like 'gas', 'value', etc., can be specified if necessary
-    })
-
-    signed_txn = w3.eth.account.sign_transaction(raw_tx, private_key=private_key_besu)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-    receipt = w3.eth.wait_for_transaction_receipt(txn_hash)
-    receipt
-    receipt.gasUsed - 21000
+for P in double_inputs:
     transactions_data.append({
-        'Repo1JacDouble': receipt.gasUsed - 21000
+        'Repo1JacDouble': gas_used(compare_contract.functions.checkJacobianDoubleNormal(P.x, P.y))
     })
 
-
     ############################################################################################
     # Double points
     # Repo2
-    raw_tx = compare_contract.functions.checkJacobianDoubleFCC(P.x, P.y).build_transaction({
-        'from':  account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        "gasPrice": 0
-        # Additional fields like 'gas', 'value', etc., can be specified if necessary
-    })
-
-    signed_txn = w3.eth.account.sign_transaction(raw_tx, private_key=private_key_besu)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-    receipt = w3.eth.wait_for_transaction_receipt(txn_hash)
-    receipt
-    receipt.gasUsed - 21000
     transactions_data.append({
-        'Repo2JacDouble': receipt.gasUsed - 21000
+        'Repo2JacDouble': gas_used(compare_contract.functions.checkJacobianDoubleFCC(P.x, P.y))
     })
 
     ############################################################################################
     # Jacobian Double
     # Opt propose
-    raw_tx = compare_contract.functions.checkJacobianDoubleOpt(P.x, P.y).build_transaction({
-        'from':  account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        "gasPrice": 0
-        # Additional fields like 'gas', 'value', etc., can be specified if necessary
-    })
-
-    signed_txn = w3.eth.account.sign_transaction(raw_tx, private_key=private_key_besu)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-    receipt = w3.eth.wait_for_transaction_receipt(txn_hash)
-    receipt
-    receipt.gasUsed - 21000
     transactions_data.append({
-        'ProposedJacDouble': receipt.gasUsed - 21000
+        'ProposedJacDouble': gas_used(compare_contract.functions.checkJacobianDoubleOpt(P.x, P.y))
     })
 
     # REPO 3 XXXXXXX
@@ -242,83 +269,30 @@ for i in range(250):
 ############################################################################################
 # START ADD POINT
 ############################################################################################
-
-P1 = curve.add_points(curve.G, curve.G)
-for i in range(250):
-    P1 = curve.add_points(P1, curve.G)
-    P2 = curve.add_points(P1, pk)
-
-    raw_tx = compare_contract.functions.checkAddPointBase(P1.x, P1.y, P2.x, P2.y).build_transaction({
-        'from':  account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        "gasPrice": 0
-        # Additional fields like 'gas', 'value', etc., can be specified if necessary
-    })
-
-    signed_txn = w3.eth.account.sign_transaction(raw_tx, private_key=private_key_besu)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-    receipt = w3.eth.wait_for_transaction_receipt(txn_hash)
-    receipt
-    receipt.gasUsed - 21000
+for P1, P2 in add_inputs:
     transactions_data.append({
-        'Repo1AddPoint': receipt.gasUsed - 21000
+        'Repo1AddPoint': gas_used(compare_contract.functions.checkAddPointBase(P1.x, P1.y, P2.x, P2.y))
     })
+
     ############################################################################################################
     # Add points
     # Repo2
-
-    raw_tx = compare_contract.functions.checkAddPointFCC(P1.x, P1.y, P2.x, P2.y).build_transaction({
-        'from':  account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        "gasPrice": 0
-        # Additional fields like 'gas', 'value', etc., can be specified if necessary
-    })
-
-    signed_txn = w3.eth.account.sign_transaction(raw_tx, private_key=private_key_besu)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-    receipt = w3.eth.wait_for_transaction_receipt(txn_hash)
-    receipt
-    receipt.gasUsed - 21000
     transactions_data.append({
-        'Repo2AddPoint': receipt.gasUsed - 21000
+        'Repo2AddPoint': gas_used(compare_contract.functions.checkAddPointFCC(P1.x, P1.y, P2.x, P2.y))
     })
 
     ############################################################################################
     # Jacobian Add
     # Repo3
-    raw_tx = compare_contract.functions.checkAddPointSECP256(P1.x, P1.y, P2.x, P2.y).build_transaction({
-        'from':  account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        "gasPrice": 0
-        # Additional fields like 'gas', 'value', etc., can be specified if necessary
-    })
-
-    signed_txn = w3.eth.account.sign_transaction(raw_tx, private_key=private_key_besu)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-    receipt = w3.eth.wait_for_transaction_receipt(txn_hash)
-    receipt
-    receipt.gasUsed - 21000
     transactions_data.append({
-        'Repo3AddPoint': receipt.gasUsed - 21000
+        'Repo3AddPoint': gas_used(compare_contract.functions.checkAddPointSECP256(P1.x, P1.y, P2.x, P2.y))
     })
 
     ############################################################################################
     # Jacobian Add
     # Proposed
-    raw_tx = compare_contract.functions.checkAddPointOpt(P1.x, P1.y, P2.x, P2.y).build_transaction({
-        'from':  account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        "gasPrice": 0
-        # Additional fields like 'gas', 'value', etc., can be specified if necessary
-    })
-
-    signed_txn = w3.eth.account.sign_transaction(raw_tx, private_key=private_key_besu)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-    receipt = w3.eth.wait_for_transaction_receipt(txn_hash)
-    receipt
-    receipt.gasUsed - 21000
     transactions_data.append({
-        'ProposedAddPoint': receipt.gasUsed - 21000
+        'ProposedAddPoint': gas_used(compare_contract.functions.checkAddPointOpt(P1.x, P1.y, P2.x, P2.y))
     })
 
 ###############################################################################################
@@ -329,66 +303,25 @@ for i in range(250):
 ###############################################################################################
 # START SCALAR MULT
 ###############################################################################################
-
-###############################################################################################
-
-for i in range(250):
-    ski = secrets.randbelow(sk)
-    raw_tx = compare_contract.functions.checkScalarMultiplication(ski, curve.G.x, curve.G.y).build_transaction({
-        'from':  account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        "gasPrice": 0
-        # Additional fields like 'gas', 'value', etc., can be specified if necessary
-    })
-
-    signed_txn = w3.eth.account.sign_transaction(raw_tx, private_key=private_key_besu)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-    receipt = w3.eth.wait_for_transaction_receipt(txn_hash)
-    receipt
-    receipt.gasUsed - 21000
+for ski in scalar_inputs:
     transactions_data.append({
-        'Repo1Scalar': receipt.gasUsed - 21000
+        'Repo1Scalar': gas_used(compare_contract.functions.checkScalarMultiplication(ski, curve.G.x, curve.G.y))
     })
 
     ########################### REPO 2
     # Not provided
 
-###############################################################################################
+    ###############################################################################################
     # scalar mul
-    raw_tx = compare_contract.functions.checkScalrMulSecp256k1(ski, curve.G.x, curve.G.y).build_transaction({
-        'from':  account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        "gasPrice": 0
-        # Additional fields like 'gas', 'value', etc., can be specified if necessary
-    })
-
-    signed_txn = w3.eth.account.sign_transaction(raw_tx, private_key=private_key_besu)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-    receipt = w3.eth.wait_for_transaction_receipt(txn_hash)
-    receipt
-    receipt.gasUsed - 21000
     transactions_data.append({
-        'Repo3Scalar': receipt.gasUsed - 21000
+        'Repo3Scalar': gas_used(compare_contract.functions.checkScalrMulSecp256k1(ski, curve.G.x, curve.G.y))
     })
 
     # scalar mul
-    raw_tx = compare_contract.functions.checkScalarOptMultiplication(ski, curve.G.x, curve.G.y).build_transaction({
-        'from':  account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        "gasPrice": 0
-        # Additional fields like 'gas', 'value', etc., can be specified if necessary
-    })
-
-    signed_txn = w3.eth.account.sign_transaction(raw_tx, private_key=private_key_besu)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-    receipt = w3.eth.wait_for_transaction_receipt(txn_hash)
-    receipt
-    receipt.gasUsed - 21000
     transactions_data.append({
-        'ProposedScalar': receipt.gasUsed - 21000
+        'ProposedScalar': gas_used(compare_contract.functions.checkScalarOptMultiplication(ski, curve.G.x, curve.G.y))
     })
 
-
 #########################################################################################
 # END SCALAR TESTS
 #########################################################################################
@@ -397,46 +330,42 @@ for i in range(250):
 ############################################################################################
 # START Strauss-Shamir's Trick
 #############################################################################################
-
-for i in range(250):
-    sk1 = secrets.randbelow(sk)
-    sk2 = secrets.randbelow(sk)
-
-    raw_tx = compare_contract.functions.checkShamirTrickFCC(sk1, sk2, pk.x, pk.y).build_transaction({
-        'from':  account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        "gasPrice": 0
-        # Additional fields like 'gas', 'value', etc., can be specified if necessary
-    })
-
-    signed_txn = w3.eth.account.sign_transaction(raw_tx, private_key=private_key_besu)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-    receipt = w3.eth.wait_for_transaction_receipt(txn_hash)
-    receipt
-    receipt.gasUsed - 21000
+for sk1, sk2 in strauss_inputs:
     transactions_data.append({
-        'Repo2Strauss': receipt.gasUsed - 21000
+        'Repo2Strauss': gas_used(compare_contract.functions.checkShamirTrickFCC(sk1, sk2, pk.x, pk.y))
     })
 
     ###############################################################################################
     ###############################################################################################
     #   Shamir's trick
     #
-
-    raw_tx = compare_contract.functions.checkShamirsTrickOpt(sk1, sk2, pk.x, pk.y).build_transaction({
-        'from':  account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        "gasPrice": 0
-        # Additional fields like 'gas', 'value', etc., can be specified if necessary
+    transactions_data.append({
+        'ProposedStrauss': gas_used(compare_contract.functions.checkShamirsTrickOpt(sk1, sk2, pk.x, pk.y))
     })
 
-    signed_txn = w3.eth.account.sign_transaction(raw_tx, private_key=private_key_besu)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-    receipt = w3.eth.wait_for_transaction_receipt(txn_hash)
-    receiptistic
-    receipt.gasUsed - 21000
+############################################################################################
+# START calldata encoding of the verification
+# The same signature is verified with the ABI encoded arguments (verifyECDSA and
+# verifyECDSARecover) and with the packed arguments (verifyECDSAPacked). The gas
+# includes the calldata cost, the size of the calldata is reported too.
+#############################################################################################
+# The key is set with a transaction on the dedicated contract (an estimate does not change the state)
+send_transaction(verify_contract.functions.updatePublicKey(verify_pk.x, verify_pk.y))
+for val1, val2, val3, preimage, (r, s, parity) in verify_inputs:
+    # Recovery id of the signature: 27 + parity of R.y (verifyECDSA uses the curve operations)
+    v = 27 + parity
+    transactions_data.append({
+        'VerifyABI': gas_used(verify_contract.functions.verifyECDSA(10000, val1, val2, val3, r, s)),
+        'VerifyABIBytes': len(Web3.to_bytes(hexstr=verify_contract.encodeABI(fn_name='verifyECDSA', args=[10000, val1, val2, val3, r, s])))
+    })
+    transactions_data.append({
+        'VerifyRecoverABI': gas_used(verify_contract.functions.verifyECDSARecover(10000, val1, val2, val3, r, s, v)),
+        'VerifyRecoverABIBytes': len(Web3.to_bytes(hexstr=verify_contract.encodeABI(fn_name='verifyECDSARecover', args=[10000, val1, val2, val3, r, s, v])))
+    })
+    data = pack_signature(preimage, (r, s, v))
     transactions_data.append({
-        'ProposedStrauss': receipt.gasUsed - 21000
+        'VerifyPacked': gas_used(verify_contract.functions.verifyECDSAPacked(data)),
+        'VerifyPackedBytes': len(Web3.to_bytes(hexstr=verify_contract.encodeABI(fn_name='verifyECDSAPacked', args=[data])))
     })
 #########################################################################################
 #########################################################################################
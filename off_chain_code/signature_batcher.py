@@ -0,0 +1,151 @@
+import threading
+import time
+import concurrent.futures
+from dataclasses import dataclass
+
+#############################################################
+# This file contains the batcher of the threshold signatures ready to be
+# submitted to VerifyThresholdECDSA. Signatures are grouped and submitted
+# with a single call to the batch entry points
+# (verifyECDSAForInterChainSyncDataExecutionBatch / verifyECDSAForInterChainSyncDataEndBatch)
+# when the batch reaches its maximum size or when the oldest signature
+# has waited for the maximum delay.
+# The contract emits eventBatchSignatureVerified for each signature: when a
+# confirm function is given, the receipt of each batch is awaited in the
+# background and every signature gets its own result.
+#############################################################
+
+# Class of a signature of an inter-chain transaction (InterChainSignature in the smart contract)
+@dataclass
+class InterChainSignature:
+    nonce: int
+    sender: str
+    val: int
+    r: int
+    s: int
+    v: int = 0
+
+    def as_tuple(self):
+        return (self.nonce, self.sender, self.val, self.r, self.s, self.v)
+
+
+# Class implementing the batcher thread. The submit function receives the list of
+# signatures of a batch and returns the hash of the transaction that carries it.
+# The optional confirm function receives the hash and returns the result of each
+# signature (True if valid), it raises an exception if the batch has failed
+class SignatureBatcher(threading.Thread):
+    def __init__(self, submit, max_batch=16, max_delay=2.0, confirm=None, confirm_workers=4):
+        super().__init__(daemon=True)
+        self.submit = submit
+        self.confirm = confirm
+        # The receipts are awaited by other threads, so batches are still submitted back to back
+        self.confirmations = concurrent.futures.ThreadPoolExecutor(max_workers=confirm_workers) if confirm is not None else None
+        self.max_batch = max_batch # max number of signatures in a transaction
+        self.max_delay = max_delay # max seconds a signature waits before being submitted
+        self.condition = threading.Condition()
+        self.pending = [] # (signature, future, arrival time)
+        self.stopped = False
+
+    # Function to add a signature ready to be submitted, it returns a future resolved with
+    # (transaction hash, index of the signature in the batch, result of the signature).
+    # The result is None without a confirm function
+    def add(self, signature):
+        future = concurrent.futures.Future()
+        with self.condition:
+            self.pending.append((signature, future, time.monotonic()))
+            self.condition.notify()
+        return future
+
+    # Function to wait until a batch is ready, it returns the batch (empty when stopped)
+    def next_batch(self):
+        with self.condition:
+            while True:
+                if len(self.pending) >= self.max_batch:
+                    break
+                if self.pending:
+                    remaining = self.pending[0][2] + self.max_delay - time.monotonic()
+                    if remaining <= 0 or self.stopped:
+                        break
+                    self.condition.wait(remaining)
+                elif self.stopped:
+                    break
+                else:
+                    self.condition.wait()
+            batch = self.pending[:self.max_batch]
+            self.pending = self.pending[self.max_batch:]
+            return batch
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            if not batch:
+                return
+            try:
+                tx_hash = self.submit([signature for signature, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            if self.confirmations is not None:
+                self.confirmations.submit(self.resolve, tx_hash, batch)
+            else:
+                for index, (_, future, _) in enumerate(batch):
+                    future.set_result((tx_hash, index, None))
+
+    # Function to resolve the futures of a batch with the result of each signature
+    def resolve(self, tx_hash, batch):
+        try:
+            results = self.confirm(tx_hash)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for index, (_, future, _) in enumerate(batch):
+            future.set_result((tx_hash, index, results[index]))
+
+    # Function to submit the pending signatures and stop the thread
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.join()
+        if self.confirmations is not None:
+            self.confirmations.shutdown(wait=True)
+
+
+# Function to build the submit function of a batch entry point of VerifyThresholdECDSA.
+# With a receipt tracker, the transaction is tracked before it is sent (see batch_confirmer)
+def batch_submitter(w3, verify_contract, account, private_key, function_name, gas_oracle, tracker=None):
+    def submit(signatures):
+        verify_function = verify_contract.functions[function_name]([signature.as_tuple() for signature in signatures])
+        # The gas depends on the number and on the kind of the signatures (ecrecover or curve
+        # operations), so each batch is estimated. An entry running out of gas reverts the
+        # batch: the estimate is the gas needed by every entry, plus the safety margin
+        estimated_gas = int(verify_function.estimate_gas({'from': account.address}) * (1 + gas_oracle.safety_margin))
+        raw_transaction = verify_function.build_transaction({
+            "from": account.address,
+            # Pending transactions are counted to submit batches back to back
+            "nonce": w3.eth.get_transaction_count(account.address, 'pending'),
+            "gasPrice": gas_oracle.gas_price(),
+            "gas": estimated_gas
+        })
+        signed_tx = w3.eth.account.sign_transaction(raw_transaction, private_key=private_key)
+        if tracker is not None:
+            tracker.track(signed_tx.hash)
+        return w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+    return submit
+
+
+# Function to build the confirm function of a batch: it waits for the receipt with the
+# receipt tracker (given to batch_submitter too) and reads the eventBatchSignatureVerified events of the batch
+def batch_confirmer(verify_contract, tracker):
+    def confirm(tx_hash):
+        receipt = tracker.wait(tx_hash)
+        if receipt.status != 1:
+            raise RuntimeError("batch reverted: {}".format(receipt.transactionHash.hex()))
+        events = verify_contract.events.eventBatchSignatureVerified().process_receipt(receipt)
+        results = dict()
+        for event in events:
+            results[event['args']['index']] = event['args']['valid']
+        return [results.get(index) for index in range(len(results))]
+    return confirm
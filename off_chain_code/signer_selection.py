@@ -0,0 +1,98 @@
+import random
+import threading
+import time
+
+#############################################################
+# This file contains the policies used by the primary node to select the
+# t secondary nodes that sign a message.
+#
+# RandomSelection: the t signers are sampled uniformly (previous behaviour).
+# LatencyAwareSelection: the policy keeps an exponentially weighted moving
+# average (EWMA) of the commitment and partial signature latency of each
+# node. Most signers are the fastest healthy nodes, the others are sampled
+# at random among the remaining healthy nodes, so slow nodes still take part
+# in some rounds and the set of signers cannot be predicted. A node that
+# misses the deadline of a round is evicted for a cool-down period.
+#
+# A policy implements:
+#   select(candidates, threshold) -> list of the selected nodes
+#   report(node, commitment_time, signing_time) -> latencies of a round (seconds)
+#   miss(node) -> the node has missed the deadline of a round
+# and the attribute deadline (seconds, None if the policy has no deadline).
+#############################################################
+
+
+class RandomSelection:
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else random.SystemRandom()
+        self.deadline = None
+
+    def select(self, candidates, threshold):
+        return self.rng.sample(list(candidates), threshold)
+
+    def report(self, node, commitment_time, signing_time):
+        pass
+
+    def miss(self, node):
+        pass
+
+
+class LatencyAwareSelection:
+    def __init__(self, alpha=0.3, exploration=0.15, deadline=5.0, cooldown=60.0, rng=None):
+        self.alpha = alpha # weight of the last measure in the EWMA
+        self.exploration = exploration # fraction of the signers sampled at random
+        self.deadline = deadline # max seconds for the commitment and the partial signature of a node
+        self.cooldown = cooldown # seconds a node is evicted after missing the deadline
+        self.rng = rng if rng is not None else random.SystemRandom()
+        self.lock = threading.Lock()
+        self.commitment = dict() # node -> EWMA of the commitment latency
+        self.signing = dict() # node -> EWMA of the partial signature latency
+        self.evicted = dict() # node -> end of the cool-down (time.monotonic)
+        self.misses = dict() # node -> number of missed deadlines
+
+    def ewma(self, averages, node, value):
+        previous = averages.get(node)
+        averages[node] = value if previous is None else self.alpha * value + (1 - self.alpha) * previous
+
+    # Function to get the expected latency of a node, nodes never measured are tried first
+    def score(self, node):
+        return self.commitment.get(node, 0) + self.signing.get(node, 0)
+
+    def select(self, candidates, threshold):
+        now = time.monotonic()
+        with self.lock:
+            healthy = [node for node in candidates if self.evicted.get(node, 0) <= now]
+            evicted = sorted((node for node in candidates if self.evicted.get(node, 0) > now), key=lambda node: self.evicted[node])
+            if len(healthy) < threshold:
+                # Not enough healthy nodes: the evicted nodes closest to the end of the cool-down are used
+                return healthy + evicted[:threshold - len(healthy)]
+
+            healthy.sort(key=self.score)
+            num_random = min(int(round(self.exploration * threshold)), len(healthy) - threshold)
+            num_fastest = threshold - num_random
+            return healthy[:num_fastest] + self.rng.sample(healthy[num_fastest:], num_random)
+
+    def report(self, node, commitment_time, signing_time):
+        with self.lock:
+            self.ewma(self.commitment, node, commitment_time)
+            self.ewma(self.signing, node, signing_time)
+            if commitment_time + signing_time > self.deadline:
+                self.evict(node)
+
+    def miss(self, node):
+        with self.lock:
+            self.evict(node)
+
+    def evict(self, node):
+        self.misses[node] = self.misses.get(node, 0) + 1
+        self.evicted[node] = time.monotonic() + self.cooldown
+
+    # Function to get the state of the nodes: node -> (commitment EWMA, signing EWMA, misses, evicted)
+    def summary(self):
+        now = time.monotonic()
+        with self.lock:
+            nodes = set(self.commitment) | set(self.evicted)
+            return {
+                node: (self.commitment.get(node), self.signing.get(node), self.misses.get(node, 0), self.evicted.get(node, 0) > now)
+                for node in sorted(nodes)
+            }
@@ -0,0 +1,44 @@
+#############################################################
+# Core of the off-chain cryptography: elliptic curve arithmetic (curve),
+# Shamir's secret sharing (sharing) and threshold ECDSA (threshold).
+# The package has no blockchain dependencies and does not change sys.path,
+# so signer workers can import it without paying the cost of web3.
+# The submodules are imported on first access to one of their names:
+#   from threshold_core import key_gen, partial_ecdsa_sign
+#############################################################
+import importlib
+
+_EXPORTS = {
+    'Point': 'curve',
+    'EllipticCurveOperations': 'curve',
+    'EllipticCurve': 'curve',
+    'ecdsa_sign': 'curve',
+    'ecdsa_verify': 'curve',
+    'WindowTableCache': 'curve',
+    'window_tables': 'curve',
+    'lagrange_coefficient': 'sharing',
+    'generate_polynomial': 'sharing',
+    'evaluate_polynomial': 'sharing',
+    'share_secret': 'sharing',
+    'verify_shares': 'threshold',
+    'verify_public_keys': 'threshold',
+    'key_gen': 'threshold',
+    'partial_ecdsa_sign': 'threshold',
+    'combine_partial_signatures': 'threshold',
+    'public_key_address': 'threshold',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
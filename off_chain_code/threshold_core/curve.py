@@ -0,0 +1,406 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+import secrets
+import sys
+import threading
+
+# Function to sign a message
+def ecdsa_sign(sk, hash, curve):
+    hash_int = int.from_bytes(hash, "big")
+    k = secrets.randbelow(curve.n)
+    p = curve.multiply_point(k, curve.G)
+    if not curve.is_point_on_curve(p):
+        return None
+    r = p.x
+    invk = pow(k, -1, curve.n)
+    ad = (sk * r) % curve.n
+    sum_m = (hash_int + ad) % curve.n
+    s = (invk * sum_m) % curve.n
+
+    return (r, s)
+
+# Function to verify a signature
+def ecdsa_verify(pk, hash, sign, curve):
+    hash_int = int.from_bytes(hash, 'big')
+    sinv = pow(sign[1], -1, curve.n)
+    u1 = (hash_int * sinv) % curve.n
+    u2 = (sign[0] * sinv) % curve.n
+    # u1*G + u2*pk with the window tables of G and pk (cached, see WindowTableCache)
+    res = curve.multi_scalar_multiply([(u1, curve.G), (u2, pk)])
+    return sign[0] == res.x
+
+# Class Point on the elliptic Curve
+@dataclass
+class Point:
+    x: Optional[int] = None
+    y: Optional[int] = None
+
+
+# Class to implement elliptic curve operations
+@dataclass
+class EllipticCurveOperations:
+
+    # Point addition
+    def add_points(self, p1: Point, p2: Point) -> Point:
+
+        if p1.x is None or p1.y is None:
+            return p2
+
+        if p2.x is None or p2.y is None:
+            return p1
+
+        if not self.is_point_on_curve(p1) or not self.is_point_on_curve(p2):
+            raise ValueError(
+                "Invalid input: One or both of the input points are not on the elliptic curve."
+            )
+
+        if p1 == p2:
+            n = (3 * p1.x**2 + self.a) % self.p
+            d = (2 * p1.y) % self.p
+            try:
+                inv = pow(d, -1, self.p)
+            except ValueError:
+                return Point()  # Point at infinity
+            s = (n * inv) % self.p
+            x_3 = (s**2 - p1.x - p1.x) % self.p
+            y_3 = (s * (p1.x - x_3) - p1.y) % self.p
+            return Point(x_3, y_3)
+        else:
+            n = (p2.y - p1.y) % self.p
+            d = (p2.x - p1.x) % self.p
+            try:
+                inv = pow(d, -1, self.p)
+            except ValueError:
+                return Point()  # Point at infinity
+            s = (n * inv) % self.p
+            x_3 = (s**2 - p1.x - p2.x) % self.p
+            y_3 = (s * (p1.x - x_3) - p1.y) % self.p
+            return Point(x_3, y_3)
+
+    # Function to negate a point
+    def negate_point(self, p: Point) -> Point:
+        if p.x is None or p.y is None:
+            return Point()
+        return Point(p.x, (-p.y) % self.p)
+
+    # Function to perform the point subtraction
+    def subtract_points(self, p1: Point, p2: Point) -> Point:
+        neg_p2 = self.negate_point(p2)
+        return self.add_points(p1, neg_p2)
+
+    # Scalar Multiplication, the multiplications by G use the window table of G
+    def multiply_point(self, k: int, p: Point) -> Point:
+
+        if k == 0 or k >= self.n:
+            raise ValueError("k is not in the range 0 < k < n")
+
+        if p == self.G:
+            return self.multiply_fixed_point(k, p)
+        return self.double_and_add(k, p)
+
+    # Scalar multiplication of a point used many times (e.g. G or a public key):
+    # the window table of the point is built on the first use and kept in window_tables
+    def multiply_fixed_point(self, k: int, p: Point) -> Point:
+
+        if k == 0 or k >= self.n:
+            raise ValueError("k is not in the range 0 < k < n")
+
+        return self.multi_scalar_multiply([(k, p)])
+
+    # Multi-scalar multiplication: sum of k*P for the (k, P) terms.
+    # Each term costs one mixed addition per window of k, the sum is
+    # accumulated in Jacobian coordinates with a single final inversion.
+    # The points without a table (cache disabled or full) use double-and-add
+    def multi_scalar_multiply(self, terms) -> Point:
+        acc = _JACOBIAN_INFINITY
+        res = Point()
+        for k, p in terms:
+            k = k % self.n
+            if k == 0 or p.x is None or p.y is None:
+                continue
+            # The window is returned with the table: set_window may change it meanwhile
+            table, window = window_tables.get(self, p)
+            if table is None:
+                res = self.add_points(res, self.double_and_add(k, p))
+                continue
+            acc = _accumulate_window_table(acc, k, table, window, self.a, self.p)
+        return self.add_points(res, _to_affine(acc, self.p))
+
+    # Double-and-add scalar multiplication of any point
+    def double_and_add(self, k: int, p: Point) -> Point:
+
+        r = None
+
+        num_bits = k.bit_length()
+
+        for i in range(num_bits - 1, -1, -1):
+            if r is None:
+                r = p
+                continue
+
+            if r.x is None and r.y is None:
+                r = p
+
+            r = self.add_points(r, r)
+
+            if (k >> i) & 1:
+                if r.x is None and r.y is None:
+                    r = p
+                else:
+                    r = self.add_points(r, p)
+        return r
+
+    # Check if a point belongs to the curve
+    def is_point_on_curve(self, p: Point) -> bool:
+
+        if p.x is None or p.y is None:
+            return False
+        # The equation of the curve is y^2 = x^3 + ax + b. We check if the point satisfies this equation.
+        left_side = p.y**2 % self.p
+        right_side = (p.x**3 + self.a * p.x + self.b) % self.p
+        return left_side == right_side
+
+
+# Class to create an elliptic curve
+@dataclass
+class EllipticCurve(EllipticCurveOperations):
+    """
+    p: is the order of the finite field Fp
+    a: is the a constant of the elliptic curve
+    b: is the b constant of the elliptic curve
+    G: is the generator point of the abelian group G
+    n: is the order of the abelian group Gn
+    h: is the co-factor value
+    """
+
+    p: int
+    a: int
+    b: int
+    G: Point
+    n: int
+    h: int
+
+
+#############################################################
+# Precomputed window tables of the points used many times: G, the global
+# public key and the public keys of the nodes. The table of a point P has
+# a row for each window of w bits of the scalar, row i holding the
+# multiples j * 2^(w*i) * P for j = 1 .. 2^w - 1, so k*P is the sum of one
+# table entry per non-zero window: no doublings and about n_bits / w
+# additions (64 on a 256-bit curve with w = 4) instead of n_bits doublings
+# and about n_bits / 2 additions.
+#
+# The tables are kept in an LRU cache bounded by a memory cap (bytes).
+# The table of a point is built on its first use; when the cap is
+# reached the least recently used tables are evicted. A point whose
+# table does not fit the cap (or a cap of 0) is multiplied with
+# double-and-add.
+#   window_tables.resize(64 * 2**20)  # change the memory cap
+#
+# The operations of the tables are reported to count_operation(operation, count)
+# when it is set (curve_profiling.py), once per table or accumulation: the
+# Jacobian additions are point additions and each batch conversion to affine
+# coordinates is a modular inversion.
+#############################################################
+
+_JACOBIAN_INFINITY = (0, 1, 0)
+
+count_operation = None # counter hook of the operations of the window tables (None if disabled)
+
+
+# Point doubling in Jacobian coordinates (x = X/Z^2, y = Y/Z^3)
+def _jacobian_double(q, a, p):
+    x1, y1, z1 = q
+    if y1 == 0 or z1 == 0:
+        return _JACOBIAN_INFINITY
+    if count_operation is not None:
+        count_operation('point_doubling', 1)
+    yy = y1 * y1 % p
+    s = 4 * x1 * yy % p
+    zz = z1 * z1 % p
+    m = (3 * x1 * x1 + a * zz * zz) % p
+    x3 = (m * m - 2 * s) % p
+    y3 = (m * (s - x3) - 8 * yy * yy) % p
+    return (x3, y3, 2 * y1 * z1 % p)
+
+
+# Mixed addition of a Jacobian point and an affine point (x2, y2)
+def _jacobian_add_affine(q, x2, y2, a, p):
+    x1, y1, z1 = q
+    if z1 == 0:
+        return (x2, y2, 1)
+    z1z1 = z1 * z1 % p
+    h = (x2 * z1z1 - x1) % p
+    r = (y2 * z1 * z1z1 - y1) % p
+    if h == 0:
+        if r == 0:
+            return _jacobian_double(q, a, p)
+        return _JACOBIAN_INFINITY
+    hh = h * h % p
+    hhh = h * hh % p
+    v = x1 * hh % p
+    x3 = (r * r - hhh - 2 * v) % p
+    y3 = (r * (v - x3) - y1 * hhh) % p
+    return (x3, y3, z1 * h % p)
+
+
+def _to_affine(q, p):
+    x, y, z = q
+    if z == 0:
+        return Point()
+    if count_operation is not None:
+        count_operation('modular_inversion', 1)
+    zinv = pow(z, -1, p)
+    zinv2 = zinv * zinv % p
+    return Point(x * zinv2 % p, y * zinv2 * zinv % p)
+
+
+# Function to convert a list of Jacobian points to affine (x, y) tuples with a
+# single modular inversion (Montgomery's trick), the point at infinity is None
+def _batch_to_affine(points, p):
+    prefix = []
+    acc = 1
+    for _, _, z in points:
+        if z != 0:
+            acc = acc * z % p
+        prefix.append(acc)
+    if count_operation is not None:
+        count_operation('modular_inversion', 1)
+    inv = pow(acc, -1, p)
+    result = [None] * len(points)
+    for i in range(len(points) - 1, -1, -1):
+        x, y, z = points[i]
+        if z == 0:
+            continue
+        zinv = inv * (prefix[i - 1] if i > 0 else 1) % p
+        inv = inv * z % p
+        zinv2 = zinv * zinv % p
+        result[i] = (x * zinv2 % p, y * zinv2 * zinv % p)
+    return result
+
+
+# Function to build the window table of a point (list of rows of affine tuples)
+def _build_window_table(curve, point, window):
+    size = (1 << window) - 1
+    rows = []
+    base = (point.x, point.y)
+    for _ in range((curve.n.bit_length() + window - 1) // window):
+        # j*B for j = 1 .. 2^w - 1, then 2^w * B: the base of the next row
+        multiples = [(base[0], base[1], 1)]
+        for _ in range(size):
+            multiples.append(_jacobian_add_affine(multiples[-1], base[0], base[1], curve.a, curve.p))
+        multiples = _batch_to_affine(multiples, curve.p)
+        rows.append(multiples[:size])
+        base = multiples[size]
+        if base is None:
+            break
+    if count_operation is not None:
+        count_operation('point_addition', len(rows) * size)
+    return rows
+
+
+# Function to add k*P to a Jacobian accumulator using the window table of P
+def _accumulate_window_table(acc, k, table, window, a, p):
+    mask = (1 << window) - 1
+    i = 0
+    additions = 0
+    while k:
+        digit = k & mask
+        if digit:
+            entry = table[i][digit - 1]
+            if entry is not None:
+                acc = _jacobian_add_affine(acc, entry[0], entry[1], a, p)
+                additions += 1
+        k >>= window
+        i += 1
+    if count_operation is not None:
+        count_operation('point_addition', additions)
+    return acc
+
+
+class WindowTableCache:
+    def __init__(self, max_bytes=32 * 2**20, window=4):
+        self.max_bytes = max_bytes # memory cap of the tables
+        self.window = window # bits of each window
+        self.lock = threading.Lock()
+        self.tables = OrderedDict() # (curve, point) -> (table, bytes), least recently used first
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Function to estimate the memory of a table of the curve: the tuples and their coordinates
+    def table_bytes(self, curve):
+        rows = (curve.n.bit_length() + self.window - 1) // self.window
+        size = (1 << self.window) - 1
+        entry = sys.getsizeof((0, 0)) + 2 * sys.getsizeof(curve.p - 1)
+        return rows * (sys.getsizeof([None] * size) + size * entry) + sys.getsizeof([None] * rows)
+
+    # Function to get the window table of a point and the bits of its windows,
+    # it returns (None, None) if the table does not fit the cap
+    def get(self, curve, point):
+        key = (curve.p, curve.a, curve.b, point.x, point.y)
+        with self.lock:
+            entry = self.tables.get(key)
+            if entry is not None:
+                self.tables.move_to_end(key)
+                self.hits += 1
+                return entry[0], self.window
+            self.misses += 1
+            window = self.window
+            size = self.table_bytes(curve)
+            if size > self.max_bytes:
+                return None, None
+
+        # The table is built outside the lock, the same point may be built by two threads
+        if not curve.is_point_on_curve(point):
+            raise ValueError("Invalid input: the point is not on the elliptic curve.")
+        table = _build_window_table(curve, point, window)
+
+        with self.lock:
+            # A table built with an old window is used but not cached
+            if window == self.window and key not in self.tables:
+                self.tables[key] = (table, size)
+                self.bytes += size
+                self.evict()
+            return table, window
+
+    # Function to remove the least recently used tables until the memory cap is respected
+    def evict(self):
+        while self.bytes > self.max_bytes and self.tables:
+            _, (_, size) = self.tables.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def resize(self, max_bytes):
+        with self.lock:
+            self.max_bytes = max_bytes
+            self.evict()
+
+    # Function to change the bits of each window, the cached tables are dropped
+    def set_window(self, window):
+        with self.lock:
+            self.window = window
+            self.tables.clear()
+            self.bytes = 0
+
+    def clear(self):
+        with self.lock:
+            self.tables.clear()
+            self.bytes = 0
+
+    # Function to get the state of the cache
+    def summary(self):
+        with self.lock:
+            return {
+                'tables': len(self.tables),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+window_tables = WindowTableCache()
@@ -0,0 +1,72 @@
+import random
+from .sharing import share_secret, lagrange_coefficient
+
+# Function to verify is the shares are correctly generated
+def verify_shares(secret, shares, n, threshold, curve):
+    ids = list(range(1, n + 1))
+    ids_signers = random.sample(ids, threshold)
+
+    rec_sk = 0
+    for index in ids_signers:
+        rec_sk = (rec_sk + (lagrange_coefficient(index, ids_signers, curve) * shares[index-1][1]) % curve.n) % curve.n
+
+    return rec_sk == secret
+
+# Function to verify if the individual public keys are correctly generated
+def verify_public_keys(public_keys, secret, n, threshold, curve):
+    ids = list(range(1, n + 1))
+    ids_signers = random.sample(ids, threshold)
+
+    global_pk = curve.multiply_point(secret, curve.G)
+
+    # Sum of lambda_i * pk_i, the window tables of the public keys are cached for the next checks
+    rec_pk = curve.multi_scalar_multiply([(lagrange_coefficient(index, ids_signers, curve), public_keys[index-1]) for index in ids_signers])
+
+    return global_pk.x == rec_pk.x and global_pk.y == rec_pk.y
+
+# Function to generate the individual shares and public keys
+def key_gen(secret, num_nodes, threshold, curve):
+    # Generate shares
+    shares = share_secret(secret, num_nodes, threshold, curve)
+
+    # Compute individual public keys
+    public_keys = [curve.multiply_point(share[1], curve.G) for share in shares]
+
+    if (verify_shares(secret, shares, num_nodes, threshold, curve) and verify_public_keys(public_keys, secret, num_nodes, threshold, curve)):
+        return shares, public_keys
+
+    return None, None
+
+# Function used by a party to produce a partial signature.
+# The third value is the parity of the y-coordinate of R = k*G, used to compute the recovery id
+def partial_ecdsa_sign(sk, hash, k, curve):
+    hash_int = int.from_bytes(hash, "big")
+    p = curve.multiply_point(k, curve.G)
+    if not curve.is_point_on_curve(p):
+        return None
+    r = p.x
+    invk = pow(k, -1, curve.n)
+    ad = (sk * r) % curve.n
+    sum_m = (hash_int + ad) % curve.n
+    s = (invk * sum_m) % curve.n
+
+    return (r, s, p.y % 2)
+
+# Function used by the primary node to combine the partial signatures.
+# The recovery id v (27 or 28) allows the verification through ecrecover on secp256k1,
+# it is 0 if the partial signatures do not carry the parity of R
+def combine_partial_signatures(partial_signatures, ids_signers, curve):
+    r = partial_signatures[0][1][0]
+    s = 0
+    for i, index in enumerate(ids_signers):
+        s = s + lagrange_coefficient(partial_signatures[i][0], ids_signers, curve)*partial_signatures[i][1][1]
+
+    v = 27 + partial_signatures[0][1][2] if len(partial_signatures[0][1]) > 2 else 0
+    return (r, s%curve.n, v)
+
+# Function to compute the address of a public key, as stored by VerifyThresholdECDSA
+# for the verification through ecrecover: the last 20 bytes of keccak256(Px || Py).
+# eth_utils is imported here to keep the module free of blockchain dependencies
+def public_key_address(pk):
+    from eth_utils import keccak, to_checksum_address
+    return to_checksum_address(keccak(pk.x.to_bytes(32, 'big') + pk.y.to_bytes(32, 'big'))[-20:])